@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import http_client
+
+# ==========================================
+# ASSET MANIFEST (CONDITIONAL REVALIDATION + DEDUPE)
+# ==========================================
+# Committed record of every downloaded logo:
+#   {path: {url, etag, last_modified, source_sha, output_sha, checked_at, stored_at}}
+# File mtimes are useless on a fresh CI checkout, so freshness lives here.
+# Each logo is revalidated once per REFRESH_DAYS (plus a stable per-file
+# offset, so refreshes are spread over the window instead of arriving all at
+# once) with a conditional GET: an unchanged upstream image costs a 304, or at
+# worst a hash comparison, and is never re-encoded.
+#
+# Logos are content-addressed: each unique image is stored once. A path whose
+# image already exists under another name becomes an alias (stored_at = the
+# file holding the bytes) and no file is written for it; generate_map points
+# the alias name at the shared file.
+
+ASSET_MANIFEST_PATH = 'assets/data/asset_manifest.json'
+STAT_CACHE_PATH = '.cache/asset_stat.json'  # {path: [size, mtime_ns]} when its output_sha was last verified (dedupe)
+REFRESH_DAYS = 60
+DAY = 24 * 3600
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def file_sha(path):
+    with open(path, 'rb') as f:
+        return sha256(f.read())
+
+def _spread(path):
+    """Stable fraction in [0, 1) for a path (spreads refreshes over the window)."""
+    return int(hashlib.md5(path.encode('utf-8')).hexdigest()[:8], 16) / 0x100000000
+
+class AssetManifest:
+    def __init__(self, path=ASSET_MANIFEST_PATH, refresh_days=REFRESH_DAYS, stat_path=STAT_CACHE_PATH):
+        self.path = path
+        self.stat_path = stat_path
+        self.interval = refresh_days * DAY
+        self.now = int(time.time())
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.assets = json.load(f).get('assets', {})
+        except (OSError, ValueError):
+            self.assets = {}
+        self._saved = json.dumps(self.assets, sort_keys=True)
+        self._by_sha = None     # output_sha -> path of the file holding those bytes
+        self._by_source = {}    # source_sha -> output_sha (skips decoding a known upstream image)
+        for entry in self.assets.values():
+            if entry.get('source_sha') and entry.get('output_sha'):
+                self._by_source[entry['source_sha']] = entry['output_sha']
+
+    def _key(self, save_path):
+        return save_path.replace(os.sep, '/')
+
+    def _entry(self, key):
+        """Entry for key (lock held). Existing files we have no record of are adopted
+        as if checked at a spread-out point of the last window, so adoption is gradual too."""
+        entry = self.assets.get(key)
+        if entry is None:
+            entry = self.assets[key] = {}
+        if 'checked_at' not in entry and os.path.exists(key):
+            entry['checked_at'] = self.now - int(_spread(key) * self.interval)
+        return entry
+
+    def _stored_path(self, key):
+        entry = self.assets.get(key) or {}
+        return entry.get('stored_at') or key
+
+    def _holders(self):
+        """output_sha -> holding file (lock held), built on first use."""
+        if self._by_sha is None:
+            self._by_sha = {}
+            for key, entry in sorted(self.assets.items()):
+                if entry.get('output_sha') and not entry.get('stored_at') and os.path.exists(key):
+                    self._by_sha.setdefault(entry['output_sha'], key)
+        return self._by_sha
+
+    def exists(self, save_path):
+        """True if the logo is available, as a file or as an alias of another file."""
+        key = self._key(save_path)
+        with self._lock:
+            return os.path.exists(self._stored_path(key))
+
+    def is_due(self, save_path):
+        """True if the logo is missing or its revalidation is due."""
+        key = self._key(save_path)
+        with self._lock:
+            if not os.path.exists(self._stored_path(key)): return True
+            entry = self._entry(key)
+            due_at = entry.get('checked_at', 0) + self.interval * (1 + 0.25 * _spread(key))
+        return self.now >= due_at
+
+    def fetch(self, save_path, url, headers=None):
+        """
+        Conditional GET of url for save_path. Returns the new source bytes when
+        they need (re-)encoding, None when there is nothing to encode (304, same
+        bytes as before, or an upstream image already stored under another
+        name). Non-200 responses raise ValueError.
+        """
+        key = self._key(save_path)
+        with self._lock:
+            exists = os.path.exists(self._stored_path(key))
+            entry = dict(self.assets.get(key, {}))
+        request_headers = dict(headers or {})
+        if exists and entry.get('url') == url:
+            if entry.get('etag'): request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'): request_headers['If-Modified-Since'] = entry['last_modified']
+
+        resp = http_client.get(url, headers=request_headers)
+        if resp.status_code == 304 and exists:
+            self._update(key, checked_at=self.now)
+            return None
+        if resp.status_code != 200:
+            raise ValueError(f"HTTP {resp.status_code}")
+
+        source_sha = sha256(resp.content)
+        validators = {'url': url, 'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+        if exists and entry.get('source_sha') == source_sha:
+            self._update(key, checked_at=self.now, **validators)
+            return None
+        with self._lock:
+            output_sha = self._by_source.get(source_sha)
+            holder = self._holders().get(output_sha)
+            if holder and os.path.exists(holder):
+                # Same upstream image as a logo we already have: alias it, no decode
+                self._entry(key).update(validators, source_sha=source_sha, checked_at=self.now)
+                self._store(key, output_sha, None)
+                return None
+            # Validators only become current once record() has the new output stored
+            self._entry(key)['pending'] = dict(validators, source_sha=source_sha)
+        return resp.content
+
+    def record(self, save_path, output_bytes):
+        """Store the encoded output of the last fetch() and record it. True if the logo changed."""
+        key = self._key(save_path)
+        output_sha = sha256(output_bytes)
+        with self._lock:
+            entry = self._entry(key)
+            entry.update(entry.pop('pending', {}), checked_at=self.now)
+            changed = self._store(key, output_sha, output_bytes)
+            if entry.get('source_sha'): self._by_source[entry['source_sha']] = output_sha
+        return changed
+
+    def _store(self, key, output_sha, output_bytes):
+        """
+        Points key at output_sha (lock held): alias of the file already holding
+        those bytes, or a new file. Returns True if the image for key changed.
+        """
+        entry = self._entry(key)
+        holders = self._holders()
+        own_file = not entry.get('stored_at') and os.path.exists(key)
+        current = entry.get('output_sha')
+        if own_file and current is None: current = file_sha(key)
+        if current == output_sha and os.path.exists(self._stored_path(key)):
+            entry['output_sha'] = output_sha
+            return False
+
+        if own_file:
+            self._release(key, current)
+        holder = holders.get(output_sha)
+        if holder and holder != key and os.path.exists(holder):
+            if own_file: os.remove(key)
+            entry['stored_at'] = holder
+        else:
+            with open(key, 'wb') as f:
+                f.write(output_bytes)
+            entry.pop('stored_at', None)
+            holders[output_sha] = key
+        entry['output_sha'] = output_sha
+        return True
+
+    def _release(self, key, old_sha):
+        """key's file is about to change (lock held): hand its old bytes to the first alias."""
+        holders = self._holders()
+        aliases = sorted(k for k, e in self.assets.items() if e.get('stored_at') == key)
+        if holders.get(old_sha) == key: del holders[old_sha]
+        if not aliases: return
+        heir = aliases[0]
+        shutil.copyfile(key, heir)
+        self.assets[heir].pop('stored_at', None)
+        for alias in aliases[1:]:
+            self.assets[alias]['stored_at'] = heir
+        if old_sha: holders[old_sha] = heir
+
+    def dedupe(self, dirs):
+        """
+        Content-addresses the logo folders: files with the same bytes as an
+        earlier one (dirs in priority order, then by name) are deleted and
+        recorded as aliases. Returns (files removed, bytes saved).
+        A file is only hashed again when it has no recorded output_sha or its
+        size / mtime differ from when that hash was last verified (STAT_CACHE_PATH).
+        """
+        removed = saved = 0
+        try:
+            with open(self.stat_path, 'r', encoding='utf-8') as f:
+                verified = json.load(f)
+        except (OSError, ValueError):
+            verified = {}
+        stats = {}
+        with self._lock:
+            holders = self._by_sha = {}
+            for directory in dirs:
+                if not os.path.exists(directory): continue
+                with os.scandir(directory) as it:
+                    files = sorted((e.name, e) for e in it if e.name.endswith('.webp'))
+                for f, dir_entry in files:
+                    key = self._key(os.path.join(directory, f))
+                    st = dir_entry.stat()
+                    stat = [st.st_size, st.st_mtime_ns]
+                    entry = self._entry(key)
+                    had_file = not entry.pop('stored_at', None)  # A real file always wins over a stale alias
+                    sha = entry.get('output_sha')
+                    if sha is None or not had_file or verified.get(key) != stat:
+                        entry['output_sha'] = sha = file_sha(key)
+                    holder = holders.get(sha)
+                    if holder is None:
+                        holders[sha] = key
+                        stats[key] = stat
+                        continue
+                    saved += st.st_size
+                    os.remove(key)
+                    entry['stored_at'] = holder
+                    removed += 1
+            # Older aliases of files that just became aliases themselves
+            for entry in self.assets.values():
+                target = entry.get('stored_at')
+                while target and self.assets.get(target, {}).get('stored_at'):
+                    target = self.assets[target]['stored_at']
+                if target: entry['stored_at'] = target
+        os.makedirs(os.path.dirname(self.stat_path), exist_ok=True)
+        tmp = self.stat_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, separators=(',', ':'))
+        os.replace(tmp, self.stat_path)
+        return removed, saved
+
+    def aliases(self):
+        """{alias path: file holding its bytes} for every alias whose file exists."""
+        with self._lock:
+            return {k: e['stored_at'] for k, e in self.assets.items()
+                    if e.get('stored_at') and os.path.exists(e['stored_at'])}
+
+    def _update(self, key, **fields):
+        with self._lock:
+            self._entry(key).update(fields)
+
+    def save(self):
+        """Drops entries of deleted logos and writes the manifest if anything changed."""
+        with self._lock:
+            assets = {}
+            for key, entry in self.assets.items():
+                if not os.path.exists(self._stored_path(key)): continue
+                entry.pop('pending', None)
+                assets[key] = {k: v for k, v in entry.items() if v is not None}
+            self.assets = assets
+            payload = json.dumps(assets, sort_keys=True)
+        if payload == self._saved: return False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'assets': assets}, f, indent=1, sort_keys=True)
+        self._saved = payload
+        return True
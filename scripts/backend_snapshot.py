@@ -0,0 +1,318 @@
+import codecs
+import hashlib
+import json
+import os
+import time
+
+import http_client
+
+# ==========================================
+# BACKEND SNAPSHOT STORE
+# ==========================================
+# Every fetched sync-nodes payload is stored on disk as a versioned snapshot
+# (.cache/backend, restored between workflow runs). Scripts fetch through the
+# store, so the payload is downloaded once per run and shared, and each script
+# (a "consumer") gets a diff against the snapshot it processed last time:
+# new / changed / removed matches plus the teams and leagues that appeared or
+# disappeared. Work then scales with what changed, not with the fixture list.
+#
+# The feed is never held in memory as a whole: the response is parsed as it
+# arrives and each match is handed to the consumer (and appended to the stored
+# snapshot, one JSON line per match) before the next one is read, so logo
+# downloads start while the payload is still downloading and peak memory does
+# not grow with the number of fixtures.
+
+SNAPSHOT_DIR = ".cache/backend"
+KEEP_SNAPSHOTS = 10       # Versions kept on disk (older consumers fall back to a full pass)
+REUSE_MINUTES = 30        # A snapshot this recent is reused instead of refetching
+FULL_PASS_DAYS = 7        # Consumers still reprocess everything at least this often
+CHUNK_SIZE = 64 * 1024    # Response bytes read at a time
+
+def match_key(m):
+    """Stable identity of a match: the backend id, else teams + league + start time."""
+    if m.get('id'): return str(m['id'])
+    return '|'.join(str(m.get(k) or '') for k in ('league', 'home_team', 'away_team', 'timestamp'))
+
+def _canonical(data):
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+def _read(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+# --- Incremental JSON parsing ---
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+class _Reader:
+    """Text buffer over an iterator of chunks, refilled only as far as parsing needs."""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+
+    def more(self):
+        chunk = next(self.chunks, None)
+        if chunk is None: return False
+        self.buf = self.buf[self.pos:] + chunk  # Parsed text is dropped
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf): return self.buf[self.pos]
+            if not self.more(): raise ValueError("Unexpected end of JSON")
+
+    def take(self, allowed):
+        char = self.peek()
+        if char not in allowed: raise ValueError(f"Expected one of {allowed!r} at {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.more(): raise
+                continue
+            # A value touching the end of the buffer (e.g. a number) may continue in the next chunk
+            if end < len(self.buf) or not self.more():
+                self.pos = end
+                return value
+
+def iter_json_array(chunks, key='matches'):
+    """
+    Yields the elements of the top-level `key` array of a JSON object one by
+    one as `chunks` (an iterable of str) are read, without buffering the
+    document. Other top-level members are parsed and skipped.
+    """
+    reader = _Reader(chunks)
+    reader.take('{')
+    if reader.peek() == '}': return
+    while True:
+        name = reader.value()
+        reader.take(':')
+        if name == key and reader.peek() == '[':
+            reader.take('[')
+            if reader.peek() == ']':
+                reader.take(']')
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.take(',]') == ']': break
+        else:
+            reader.value()
+        if reader.take(',}') == '}': return
+
+def _text_chunks(resp):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for chunk in resp.iter_content(CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+# --- Snapshots ---
+class Snapshot:
+    """A stored version. Iterating streams its matches from disk."""
+    def __init__(self, version, fetched_at, path, count):
+        self.version = version
+        self.fetched_at = fetched_at
+        self.path = path
+        self.count = count
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+class SnapshotStream:
+    """
+    Matches of one backend fetch, yielded as the response is parsed and
+    appended to the store on the way. Once the stream is exhausted, .snapshot
+    is the stored version (an identical payload keeps its version). A stored
+    snapshot is streamed from disk instead when it is recent enough, or when
+    the fetch fails before any match arrived (the error is raised only when
+    there is none).
+    """
+    def __init__(self, store, url, headers=None, max_age_minutes=REUSE_MINUTES):
+        self.store = store
+        self.url = url
+        self.headers = headers
+        self.max_age_minutes = max_age_minutes
+        self.snapshot = None
+
+    def __iter__(self):
+        now = time.time()
+        latest = self.store.latest()
+        if latest and now - self.store.index.get('checked_at', 0) < self.max_age_minutes * 60:
+            self.snapshot = latest
+            yield from latest
+            return
+
+        tmp = os.path.join(self.store.directory, f"incoming-{os.getpid()}.jsonl")
+        os.makedirs(self.store.directory, exist_ok=True)
+        sha, count = hashlib.sha256(), 0
+        try:
+            try:
+                resp = http_client.get(self.url, headers=self.headers, stream=True)
+                resp.raise_for_status()
+                with resp, open(tmp, 'w', encoding='utf-8') as f:
+                    for m in iter_json_array(_text_chunks(resp)):
+                        line = _canonical(m)
+                        f.write(line + '\n')
+                        sha.update(line.encode('utf-8'))
+                        count += 1
+                        yield m
+            except Exception as e:
+                # Past the first match the consumer already has part of this payload
+                if latest is None or count: raise
+                print(f"   [!] Backend fetch failed ({e}); using snapshot {latest.version}")
+                self.snapshot = latest
+                yield from latest
+                return
+            self.snapshot = self.store._add(tmp, sha.hexdigest(), count, now)
+        finally:
+            if os.path.exists(tmp): os.remove(tmp)
+
+# --- Deltas ---
+class Delta:
+    """
+    Match-level changes of a snapshot against the one a consumer processed
+    last, built while the matches stream by: add(m) returns 'new', 'changed'
+    or None for each match (only `fields` are compared when given, e.g. names
+    and image fields but not live scores). Once the stream is done, removed
+    and names() cover the rest. A full delta (no usable previous snapshot, or
+    the periodic full pass is due) classifies nothing.
+    """
+    def __init__(self, previous=None, fields=None, full=False):
+        self.full = full or previous is None
+        self.fields = fields
+        self.new, self.changed = [], []
+        self._seen = set()
+        self._old = {}                                     # match key -> digest of the compared fields
+        self._old_names = {'teams': set(), 'leagues': set()}
+        self._names = {'teams': set(), 'leagues': set()}
+        if self.full: return
+        for m in previous:
+            self._old[match_key(m)] = self._digest(m)
+            self._collect(m, self._old_names)
+
+    def _digest(self, m):
+        view = {k: m.get(k) for k in self.fields} if self.fields else m
+        return hashlib.sha256(_canonical(view).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _collect(m, names):
+        names['teams'].update(n for n in (m.get('home_team'), m.get('away_team')) if n)
+        if m.get('league'): names['leagues'].add(m['league'])
+
+    def add(self, m):
+        if self.full: return None
+        key = match_key(m)
+        self._collect(m, self._names)
+        if key in self._seen: return None
+        self._seen.add(key)
+        old = self._old.get(key)
+        if old is None:
+            self.new.append(key)
+            return 'new'
+        if old != self._digest(m):
+            self.changed.append(key)
+            return 'changed'
+        return None
+
+    @property
+    def removed(self):
+        return [k for k in self._old if k not in self._seen]
+
+    def names(self, kind):
+        """{"new", "removed": [names]} for kind 'teams' or 'leagues' (after the stream)."""
+        return {"new": sorted(self._names[kind] - self._old_names[kind]),
+                "removed": sorted(self._old_names[kind] - self._names[kind])}
+
+class SnapshotStore:
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = _read(self.index_path, {"versions": []})
+
+    def _path(self, version):
+        return os.path.join(self.directory, f"{version}.jsonl")
+
+    def load(self, version):
+        entry = next((v for v in self.index['versions'] if v['version'] == version), None)
+        if entry is None or not os.path.exists(self._path(version)): return None
+        return Snapshot(version, entry.get('fetched_at', 0), self._path(version), entry.get('count', 0))
+
+    def latest(self):
+        versions = self.index['versions']
+        return self.load(versions[-1]['version']) if versions else None
+
+    def stream(self, url, headers=None, max_age_minutes=REUSE_MINUTES):
+        """Matches of the latest snapshot as they arrive (see SnapshotStream)."""
+        return SnapshotStream(self, url, headers, max_age_minutes)
+
+    def fetch(self, url, headers=None, max_age_minutes=REUSE_MINUTES):
+        """Latest snapshot, fetched and stored to the end without handing out matches."""
+        stream = self.stream(url, headers, max_age_minutes)
+        for _ in stream: pass
+        return stream.snapshot
+
+    def _add(self, tmp, sha, count, now):
+        """Stores a fully received payload (written to tmp) and returns its snapshot."""
+        latest = self.latest()
+        self.index['checked_at'] = now
+        if latest and self.index['versions'][-1]['sha'] == sha:
+            _write(self.index_path, self.index)
+            return latest
+        version = f"{int(now)}-{sha[:10]}"
+        os.replace(tmp, self._path(version))
+        self.index['versions'].append({"version": version, "sha": sha, "fetched_at": now, "count": count})
+        for old in self.index['versions'][:-KEEP_SNAPSHOTS]:
+            for path in (self._path(old['version']), os.path.join(self.directory, f"{old['version']}.json")):  # + pre-JSONL payloads
+                if os.path.exists(path): os.remove(path)
+        self.index['versions'] = self.index['versions'][-KEEP_SNAPSHOTS:]
+        _write(self.index_path, self.index)
+        return self.load(version)
+
+    # --- Consumers (one state file per script) ---
+    def _state_path(self, consumer):
+        return os.path.join(self.directory, f"state-{consumer}.json")
+
+    def state(self, consumer):
+        """Consumer state: {version, full_at, ...whatever the consumer stored}."""
+        return _read(self._state_path(consumer), {})
+
+    def delta(self, consumer, fields=None):
+        """
+        Delta for a consumer against the snapshot it last processed; full when
+        there is no usable previous snapshot or the periodic full pass is due.
+        Feed it the new snapshot's matches with add().
+        """
+        state = self.state(consumer)
+        if time.time() - state.get('full_at', 0) > FULL_PASS_DAYS * 24 * 3600:
+            return Delta(full=True)
+        previous = self.load(state['version']) if state.get('version') else None
+        return Delta(previous, fields)
+
+    def commit(self, consumer, snapshot, full, **extra):
+        """Records that the consumer has processed snapshot (call after its outputs are saved)."""
+        state = self.state(consumer)
+        state.update(extra, version=snapshot.version)
+        if full: state['full_at'] = time.time()
+        _write(self._state_path(consumer), state)
@@ -0,0 +1,234 @@
+import argparse
+import contextlib
+import copy
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import build_site
+from generate_map import build_shards, make_pretty_name, shard_key
+from image_map_codec import encode
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# Synthetic benchmark for build_site(): generates a large, seeded site
+# (config, image map, league map) in a scratch directory and times full and
+# incremental builds, end to end and per stage. Same seed + sizes = same inputs.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES = ['master_template.html', 'watch_template.html', 'league_template.html', 'page_template.html']
+
+SCALES = {
+    'small':  {'pages': 100, 'priorities': 1000, 'teams': 10000, 'leagues': 100, 'menu': 20},
+    'medium': {'pages': 300, 'priorities': 1500, 'teams': 30000, 'leagues': 250, 'menu': 50},
+    'large':  {'pages': 800, 'priorities': 3000, 'teams': 100000, 'leagues': 600, 'menu': 120},
+}
+
+WORDS = """live stream watch free match league cup final derby season round fixture
+kickoff highlights preview schedule team club united city athletic rovers wanderers
+national premier super pro open series grand prix championship tour classic""".split()
+
+# ==========================================
+# 2. SYNTHETIC INPUTS
+# ==========================================
+def words(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+def make_name(rng, i):
+    return f"{words(rng, 2).title()} {i:05d}"
+
+def make_menu(rng, n, prefix):
+    return [{'title': f"{prefix} {words(rng, 1).title()} {i}", 'url': f"/{prefix.lower()}-{i}/", 'highlight': rng.random() < 0.1} for i in range(n)]
+
+def make_article(rng, paragraphs):
+    return ''.join(f"<p>{words(rng, rng.randint(30, 80))}</p>" for _ in range(paragraphs))
+
+def generate_inputs(sizes, seed):
+    """Returns (config, image_map, league_map, shards) for the given sizes."""
+    rng = random.Random(seed)
+    config = build_site.load_json(os.path.join(REPO_ROOT, build_site.CONFIG_PATH))
+    country = config.get('site_settings', {}).get('target_country', 'US')
+
+    # Pages: keep the real home/watch pages, add many custom pages
+    pages = [p for p in config.get('pages', []) if p.get('layout') in ('home', 'watch')]
+    for i in range(sizes['pages']):
+        faqs = [{'q': f"{words(rng, 6)}?", 'a': words(rng, 25)} for _ in range(rng.randint(0, 6))]
+        pages.append({
+            'id': f"p_bench_{i}", 'slug': f"page-{i:05d}", 'title': make_name(rng, i),
+            'layout': 'page' if i % 5 else 'league',
+            'content': make_article(rng, rng.randint(3, 12)),
+            'meta_title': words(rng, 8).title(), 'meta_desc': words(rng, 25),
+            'meta_keywords': ', '.join(words(rng, 3) for _ in range(5)),
+            'schemas': {'org': True, 'website': True, 'about': i % 7 == 0, 'faq': bool(faqs), 'faq_list': faqs},
+        })
+    config['pages'] = pages
+
+    # Sport priorities: every entry gets a league page
+    priorities = {'_HIDE_OTHERS': False, '_BOOST': ''}
+    for i in range(sizes['priorities']):
+        priorities[make_name(rng, i)] = {'score': rng.randint(1, 1000), 'isLeague': rng.random() < 0.8, 'hasLink': True, 'isHidden': False}
+    config.setdefault('sport_priorities', {})[country] = priorities
+
+    # Large menus and footer grid
+    n = sizes['menu']
+    config['menus'] = {
+        'header': make_menu(rng, n, 'Header'), 'hero': make_menu(rng, n, 'Hero'),
+        'footer_links': make_menu(rng, n, 'Links'), 'footer_static': make_menu(rng, n, 'Static'),
+        'footer_leagues': make_menu(rng, n, 'Leagues'),
+    }
+    config['theme']['footer_columns'] = '3'
+    config['theme'].update({'footer_slot_1': 'brand_disclaimer', 'footer_slot_2': 'menu', 'footer_slot_3': 'menu'})
+    config['site_settings']['footer_disclaimer'] = words(rng, 60)
+
+    # Maps: teams spread over leagues (some teams play in two leagues)
+    league_names = [make_name(rng, i) for i in range(sizes['leagues'])]
+    team_slugs = [f"{words(rng, 2).replace(' ', '-')}-{i:06d}" for i in range(sizes['teams'])]
+    slug_to_path = {slug: f"/assets/logos/tsdb/{slug}.webp" for slug in team_slugs}
+    league_map = {name: [] for name in league_names}
+    for slug in team_slugs:
+        league_map[rng.choice(league_names)].append(slug)
+        if rng.random() < 0.05: league_map[rng.choice(league_names)].append(slug)
+
+    image_map = {
+        'teams': {make_pretty_name(slug): path for slug, path in slug_to_path.items()},
+        'leagues': {name: f"/assets/logos/leagues/{shard_key(name)}.webp" for name in league_names},
+    }
+    members = {}
+    for league, slugs in league_map.items():
+        members[shard_key(league)] = {'name': league, 'sports': set(), 'teams': {make_pretty_name(s): slug_to_path[s] for s in slugs}}
+    shards = build_shards(members, image_map['leagues'])
+    return config, encode(image_map['teams'], image_map['leagues']), league_map, shards
+
+def write_site(workdir, inputs):
+    config, image_map, league_map, shards = inputs
+    os.makedirs(os.path.join(workdir, 'data'), exist_ok=True)
+    os.makedirs(os.path.join(workdir, 'assets', 'data'), exist_ok=True)
+    for name in TEMPLATES:
+        src = os.path.join(REPO_ROOT, 'assets', name)
+        if os.path.exists(src): shutil.copy(src, os.path.join(workdir, 'assets', name))
+
+    digest = hashlib.sha256()
+    for path, data in ((build_site.CONFIG_PATH, config), (build_site.IMAGE_MAP_PATH, image_map),
+                       (build_site.LEAGUE_MAP_PATH, league_map), (build_site.IMAGE_MAP_SHARDS_PATH, shards)):
+        payload = json.dumps(data, indent=2, sort_keys=True)
+        digest.update(payload.encode('utf-8'))
+        with open(os.path.join(workdir, path), 'w', encoding='utf-8') as f:
+            f.write(payload)
+    return digest.hexdigest()[:16]
+
+# ==========================================
+# 3. TIMING
+# ==========================================
+def timed_build(**kwargs):
+    """One build_site() call with console output captured. Returns (seconds, stage seconds)."""
+    build_site.compile_template.cache_clear()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        profile = build_site.build_site(**kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, {name: sec for name, sec in profile.stages}
+
+def summarize(samples):
+    return {'median_ms': round(statistics.median(samples) * 1000, 3), 'min_ms': round(min(samples) * 1000, 3)}
+
+def run_benchmark(sizes, seed, repeat, jobs, minify, workdir):
+    inputs = generate_inputs(sizes, seed)
+    input_digest = write_site(workdir, inputs)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        full, noop, edit, stages = [], [], [], {}
+        for _ in range(repeat):
+            # Full build (cold: manifest ignored, every page rendered)
+            elapsed, stage_times = timed_build(force=True, jobs=jobs, minify=minify)
+            full.append(elapsed)
+            for name, sec in stage_times.items():
+                stages.setdefault(name, []).append(sec)
+            # Incremental build with nothing changed
+            noop.append(timed_build(jobs=jobs, minify=minify)[0])
+            # Incremental build after one custom page's SEO text changes (then restored)
+            with open(build_site.CONFIG_PATH, 'r', encoding='utf-8') as f: original = f.read()
+            config = json.loads(original)
+            config['pages'][-1]['meta_desc'] += ' edited'
+            with open(build_site.CONFIG_PATH, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, sort_keys=True)
+            edit.append(timed_build(jobs=jobs, minify=minify)[0])
+            with open(build_site.CONFIG_PATH, 'w', encoding='utf-8') as f: f.write(original)
+    finally:
+        os.chdir(cwd)
+
+    return {
+        'sizes': sizes, 'seed': seed, 'repeat': repeat, 'jobs': jobs, 'minify': minify,
+        'input_digest': input_digest,
+        'python': sys.version.split()[0], 'cpus': os.cpu_count(),
+        'full_build': summarize(full),
+        'noop_build': summarize(noop),
+        'one_page_edit': summarize(edit),
+        'stages': {name: summarize(samples) for name, samples in stages.items()},
+    }
+
+def print_report(result, baseline=None):
+    def delta(section, name=None):
+        if not baseline: return ''
+        old = baseline.get(section, {})
+        if name is not None: old = old.get(name, {})
+        if not old.get('median_ms'): return ''
+        new = result[section] if name is None else result[section][name]
+        return f"  ({(new['median_ms'] / old['median_ms'] - 1) * 100:+.1f}% vs baseline)"
+
+    s = result['sizes']
+    print(f"--- 📊 Build Benchmark (seed {result['seed']}, inputs {result['input_digest']}) ---")
+    print(f"   {s['pages']} pages, {s['priorities']} league pages, {s['teams']:,} teams / {s['leagues']} leagues, "
+          f"menus x{s['menu']}, jobs={result['jobs']}, minify={result['minify']}, repeat={result['repeat']}")
+    for section in ('full_build', 'noop_build', 'one_page_edit'):
+        r = result[section]
+        print(f"   {section:<30} median {r['median_ms']:>10.2f} ms   min {r['min_ms']:>10.2f} ms{delta(section)}")
+    print("   Stages (full build):")
+    for name, r in result['stages'].items():
+        print(f"     {name:<28} median {r['median_ms']:>10.2f} ms   min {r['min_ms']:>10.2f} ms{delta('stages', name)}")
+    if baseline and baseline.get('input_digest') != result['input_digest']:
+        print("   [!] Baseline was measured on different inputs (sizes/seed); deltas are not comparable.")
+
+# ==========================================
+# 4. MAIN EXECUTION
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible synthetic benchmark for build_site.py")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help="preset input sizes (default: small)")
+    for key in ('pages', 'priorities', 'teams', 'leagues', 'menu'):
+        parser.add_argument(f'--{key}', type=int, help=f"override the preset number of {key}")
+    parser.add_argument('--seed', type=int, default=1337)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--minify', action='store_true')
+    parser.add_argument('--out', metavar='JSON', help="write the results to this file")
+    parser.add_argument('--baseline', metavar='JSON', help="compare against a previous --out file")
+    parser.add_argument('--keep', metavar='DIR', help="generate the site in DIR and keep it (default: temp dir)")
+    args = parser.parse_args()
+
+    sizes = copy.deepcopy(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None: sizes[key] = getattr(args, key)
+
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        result = run_benchmark(sizes, args.seed, args.repeat, args.jobs, args.minify, os.path.abspath(args.keep))
+    else:
+        with tempfile.TemporaryDirectory(prefix='bench_build_') as workdir:
+            result = run_benchmark(sizes, args.seed, args.repeat, args.jobs, args.minify, workdir)
+
+    print_report(result, build_site.load_json(args.baseline) if args.baseline else None)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"   -> Results: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import random
+import statistics
+import string
+import sys
+import time
+from difflib import get_close_matches
+
+from asset_manifest import AssetManifest
+from fuzzy_index import FuzzyIndex
+from generate_map import FUZZY_CUTOFF, index_team_logos
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# Parity check + timing of fuzzy_index.FuzzyIndex against the difflib scan it
+# replaces in generate_map: every query must get exactly the slug (or None)
+# that get_close_matches(word, slugs, n=1, cutoff) returns. Queries are
+# seeded variations of the library slugs (typos, dropped/added words),
+# unrelated words and very short strings. Exits 1 on any mismatch.
+SUFFIXES = ['fc', 'cf', 'sc', 'afc', 'united', 'city', 'women', 'u21', 'ii', 'club']
+ALPHABET = string.ascii_lowercase + string.digits + '-'
+
+# ==========================================
+# 2. INPUTS
+# ==========================================
+def synthetic_slugs(rng, n):
+    """Team-like slugs ('word-word[-suffix]') when there is no logo library to test on."""
+    syllables = ['ar', 'be', 'ca', 'do', 'el', 'fi', 'go', 'ha', 'in', 'jo', 'ka', 'lu', 'ma', 'no', 'or', 'pa', 'ri', 'sa', 'to', 'vi']
+    def word(): return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+    slugs = set()
+    while len(slugs) < n:
+        parts = [word() for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.3: parts.append(rng.choice(SUFFIXES))
+        slugs.add('-'.join(parts))
+    return sorted(slugs)
+
+def mutate(rng, slug):
+    """One to three random edits of slug."""
+    chars = list(slug)
+    for _ in range(rng.randint(1, 3)):
+        op = rng.choice(['delete', 'insert', 'replace', 'swap'])
+        i = rng.randrange(len(chars) + 1)
+        if op == 'insert' or not chars:
+            chars.insert(i, rng.choice(ALPHABET))
+        elif op == 'delete':
+            del chars[min(i, len(chars) - 1)]
+        elif op == 'replace':
+            chars[min(i, len(chars) - 1)] = rng.choice(ALPHABET)
+        elif len(chars) > 1:
+            i = min(i, len(chars) - 2)
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return ''.join(chars)
+
+def make_queries(rng, slugs, n):
+    queries = set()
+    while len(queries) < n:
+        slug = rng.choice(slugs)
+        kind = rng.random()
+        if kind < 0.5:
+            queries.add(mutate(rng, slug))
+        elif kind < 0.7:
+            words = slug.split('-')
+            if len(words) > 1 and rng.random() < 0.5: words.pop(rng.randrange(len(words)))
+            else: words.insert(rng.randint(0, len(words)), rng.choice(SUFFIXES))
+            queries.add('-'.join(words))
+        elif kind < 0.8:
+            queries.add(slug)
+        elif kind < 0.9:
+            queries.add(''.join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 24))))
+        else:
+            queries.add(''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 3))))
+    return sorted(queries)
+
+# ==========================================
+# 3. MAIN EXECUTION
+# ==========================================
+def percentile(samples, p):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity check and timing of the fuzzy slug index against difflib")
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--synthetic', type=int, metavar='N', help="test on N synthetic slugs instead of the local logo library")
+    parser.add_argument('--cutoff', type=float, default=FUZZY_CUTOFF)
+    parser.add_argument('--seed', type=int, default=1337)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    slugs = synthetic_slugs(rng, args.synthetic) if args.synthetic else sorted(index_team_logos(AssetManifest().aliases()))
+    if not slugs:
+        print("   [!] No logos found (run from the repo root, or use --synthetic N)")
+        sys.exit(1)
+    queries = make_queries(rng, slugs, args.queries)
+
+    start = time.perf_counter()
+    index = FuzzyIndex(slugs, args.cutoff)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    mismatches, hits, difflib_ms, index_ms = [], 0, [], []
+    for word in queries:
+        start = time.perf_counter()
+        expected = get_close_matches(word, slugs, n=1, cutoff=args.cutoff)
+        difflib_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        found = index.best(word)
+        index_ms.append((time.perf_counter() - start) * 1000)
+        expected = expected[0] if expected else None
+        if found != expected: mismatches.append((word, expected, found))
+        if found is not None: hits += 1
+
+    print(f"--- Fuzzy Index vs difflib ({len(slugs)} slugs, {len(queries)} queries, cutoff {args.cutoff}, seed {args.seed}) ---")
+    print(f"   Index built in {build_ms:.1f} ms; {hits} queries matched")
+    for name, samples in [('difflib', difflib_ms), ('index', index_ms)]:
+        print(f"   {name:<8} mean {statistics.mean(samples):>8.3f} ms   median {statistics.median(samples):>8.3f} ms   "
+              f"p99 {percentile(samples, 0.99):>8.3f} ms   total {sum(samples):>9.1f} ms")
+    if mismatches:
+        print(f"   [!] {len(mismatches)} mismatches:")
+        for word, expected, found in mismatches[:10]:
+            print(f"     {word!r}: difflib {expected!r}, index {found!r}")
+        sys.exit(1)
+    print("   Parity: OK")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,15 @@
+import functools
+import hashlib
 import json
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import image_map_codec
+import minify
+from image_map_codec import decode, encode
+from minify import compressed_siblings, minify_html, remove_precompressed, write_precompressed
 
 # ==========================================
 # 1. CONFIGURATION
@@ -8,11 +17,17 @@ import re
 CONFIG_PATH = 'data/config.json'
 LEAGUE_MAP_PATH = 'assets/data/league_map.json' 
 IMAGE_MAP_PATH = 'assets/data/image_map.json'
+IMAGE_MAP_SHARDS_PATH = 'assets/data/image_map_shards.json'
 TEMPLATE_PATH = 'assets/master_template.html'
 WATCH_TEMPLATE_PATH = 'assets/watch_template.html'
 LEAGUE_TEMPLATE_PATH = 'assets/league_template.html'
 PAGE_TEMPLATE_PATH = 'assets/page_template.html'
 OUTPUT_DIR = '.' 
+ASSET_DATA_DIR = 'assets/data' # Fingerprinted JSON published for the browser
+BUILD_MANIFEST_PATH = '.build_manifest.json' # Input hash of every generated page (incremental builds)
+PROFILE_REPORT_PATH = 'build_profile.json' # Default --profile JSON report
+SCHEDULE_DIR = 'assets/data/schedule' # Match schedule snapshots (scripts/snapshot_schedule.py)
+CODE_FILES = [__file__, minify.__file__, image_map_codec.__file__] # Build code the page output depends on
 
 # ==========================================
 # SMART ENTITY MAPPING (LEAGUE -> SPORT)
@@ -75,9 +90,123 @@ def load_json(path):
             return {}
     return {}
 
+def publish_json_asset(data, stem, precompress=False):
+    """
+    Write data as a content-hashed static file (e.g. image_map.<hash>.json)
+    that browsers and the CDN can cache forever. Older fingerprints of the
+    same stem (and their .gz/.br copies) are removed. Returns the public URL.
+    """
+    payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    digest = hashlib.sha256(payload).hexdigest()[:10]
+    filename = f"{stem}.{digest}.json"
+    out_dir = os.path.join(OUTPUT_DIR, ASSET_DATA_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    stale = re.compile(rf'^{re.escape(stem)}\.[0-9a-f]{{10}}\.json(\.gz|\.br)?$')
+    for f in os.listdir(out_dir):
+        if not f.startswith(filename) and stale.match(f):
+            os.remove(os.path.join(out_dir, f))
+
+    path = os.path.join(out_dir, filename)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(payload)
+    if precompress and not all(os.path.exists(p) for p in compressed_siblings(path)):
+        write_precompressed(path, payload)
+    return f"/{ASSET_DATA_DIR}/{filename}"
+
+def prune_json_assets(prefix, keep):
+    """
+    Remove fingerprinted files whose name starts with prefix (e.g. every
+    image_map.*.<hash>.json, with their .gz/.br copies) unless their public
+    URL is in keep: shards of leagues that are gone are not republished, so
+    publish_json_asset never prunes them. Returns the number of files removed.
+    """
+    out_dir = os.path.join(OUTPUT_DIR, ASSET_DATA_DIR)
+    if not os.path.isdir(out_dir): return 0
+    fingerprinted = re.compile(rf'^{re.escape(prefix)}\.(?:.+\.)?[0-9a-f]{{10}}\.json$')
+    removed = 0
+    for f in os.listdir(out_dir):
+        name = re.sub(r'\.(gz|br)$', '', f)
+        if fingerprinted.match(name) and f"/{ASSET_DATA_DIR}/{name}" not in keep:
+            os.remove(os.path.join(out_dir, f))
+            removed += 1
+    return removed
+
+def input_digest(*parts):
+    """Stable sha256 over the canonical JSON form of the given build inputs."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def file_digest(path):
+    if not os.path.exists(path): return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def write_if_changed(path, data):
+    """Write bytes to path unless the file already holds exactly these bytes. Returns True if written."""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == data: return False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+class BuildManifest:
+    """
+    Persistent map of output file -> [hash of its inputs, hash of its bytes,
+    size, mtime_ns]. A page is skipped when its inputs are unchanged and the
+    file on disk is still exactly what the last build wrote; the file is only
+    hashed again when its size or mtime differ from the recorded ones.
+    """
+    VERSION = 1
+
+    def __init__(self, path, force=False):
+        self.path = path
+        data = {} if force else load_json(path)
+        self.previous = data.get('outputs', {}) if data.get('version') == self.VERSION else {}
+        self.outputs = {}
+
+    @staticmethod
+    def _stat(out_path):
+        try:
+            st = os.stat(out_path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def is_fresh(self, out_path, key):
+        name = os.path.relpath(out_path, OUTPUT_DIR)
+        prev = self.previous.get(name)
+        if not prev or prev[0] != key: return False
+        stat = self._stat(out_path)
+        if stat is None: return False
+        if prev[2:] != stat and file_digest(out_path) != prev[1]: return False
+        self.outputs[name] = prev[:2] + stat
+        return True
+
+    def record(self, out_path, key, output_digest):
+        name = os.path.relpath(out_path, OUTPUT_DIR)
+        self.outputs[name] = [key, output_digest] + (self._stat(out_path) or [])
+
+    def save(self):
+        if self.outputs == self.previous and os.path.exists(self.path): return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.VERSION, "outputs": self.outputs}, f, indent=1, sort_keys=True)
+
 def normalize_key(s):
     return re.sub(r'[^a-z0-9]', '', s.lower())
 
+def league_page_filters(config):
+    """Names of the sport_priorities entries that get a /<name>-streams/ league page."""
+    country = config.get('site_settings', {}).get('target_country', 'US')
+    priorities = config.get('sport_priorities', {}).get(country, {})
+    return [name for name, data in priorities.items() if not name.startswith('_') and data.get('hasLink')]
+
 def ensure_unit(val, unit='px'):
     s_val = str(val).strip()
     if not s_val: return f"0{unit}"
@@ -116,6 +245,87 @@ def build_menu_html(menu_items, section):
             html += f'<a href="{url}">{title}</a>'
     return html
 
+# ==========================================
+# TEMPLATE ENGINE (COMPILE ONCE, RENDER IN ONE JOIN)
+# ==========================================
+# Tokens the browser fills in at runtime (watch page SEO strings). They are
+# kept verbatim instead of being treated as server-side slots.
+CLIENT_PLACEHOLDERS = {'HOME', 'AWAY', 'VS', 'LEAGUE', 'SPORT', 'DATE', 'TIME'}
+
+# Slots the templates reference but the builder has never filled. They stay
+# verbatim (as before) until the theme grows a value for them.
+LEGACY_PLACEHOLDERS = {'THEME_META_COLOR', 'THEME_ARTICLE_H3_BORDER', 'THEME_ARTICLE_H4_BORDER', 'THEME_WATCH_INFO_BTN_HOVER'}
+
+# Literal markup the renderer rewrites per page. Compiled into named slots so
+# they are resolved in the same single pass as the {{...}} placeholders.
+TOKEN_RE = re.compile(
+    r'(?P<CANONICAL_LINK><link rel="canonical" href="\{\{CANONICAL_URL\}\}">)'
+    r'|(?P<SHARE_CONFIG>const SHARE_CONFIG = \{.*?\};)'
+    r'|(?P<HTML_LANG>lang="en")'
+    r'|(?P<HEAD_CLOSE></head>)'
+    r'|\{\{(?P<slot>[A-Za-z0-9_]+)\}\}',
+    re.DOTALL
+)
+PLACEHOLDER_RE = re.compile(r'\{\{([A-Za-z0-9_]+)\}\}')
+
+# Injected values that may reference page slots such as {{SITE_NAME}}: the
+# watch settings (pasted into the template ahead of the old chained replaces,
+# so the configured watch article relies on it) and the theme texts. Every
+# other value (page articles, FAQ, league articles) is output as is.
+RESOLVED_SLOTS = {'JS_WATCH_TITLE_TPL', 'JS_WATCH_DESC_TPL', 'WATCH_ARTICLE', 'WATCH_AD_MOBILE',
+                  'WATCH_AD_SIDEBAR_1', 'WATCH_AD_SIDEBAR_2', 'SUPABASE_URL', 'SUPABASE_KEY'}
+RESOLVED_SLOT_PREFIXES = ('TEXT_', 'THEME_TEXT_')
+
+class TemplateError(ValueError):
+    pass
+
+class Template:
+    """
+    A template split into literal chunks and named slots.
+    literals[i] is followed by slots[i]; the last literal closes the page.
+    """
+    def __init__(self, source, name='template'):
+        self.name = name
+        self.source = source
+        self.digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        self.literals = []
+        self.slots = []
+        buf = []
+        pos = 0
+        for m in TOKEN_RE.finditer(source):
+            slot = m.lastgroup if m.lastgroup != 'slot' else m.group('slot')
+            buf.append(source[pos:m.start()])
+            pos = m.end()
+            if slot in CLIENT_PLACEHOLDERS or slot in LEGACY_PLACEHOLDERS:
+                buf.append(m.group(0))
+                continue
+            self.literals.append(''.join(buf))
+            self.slots.append(slot)
+            buf = []
+        buf.append(source[pos:])
+        self.literals.append(''.join(buf))
+        self.resolved = [slot in RESOLVED_SLOTS or slot.startswith(RESOLVED_SLOT_PREFIXES) for slot in self.slots]
+
+    def render(self, context, slot_sizes=None):
+        # slot_sizes (optional dict) collects the UTF-8 bytes each slot contributes (--profile)
+        out = [self.literals[0]]
+        for slot, literal, resolved in zip(self.slots, self.literals[1:], self.resolved):
+            try:
+                val = context[slot]
+            except KeyError:
+                raise TemplateError(f"Unknown placeholder {{{{{slot}}}}} in {self.name}") from None
+            if resolved and '{{' in val:
+                val = PLACEHOLDER_RE.sub(lambda m: context.get(m.group(1), m.group(0)), val)
+            if slot_sizes is not None:
+                slot_sizes[slot] = slot_sizes.get(slot, 0) + len(val.encode('utf-8'))
+            out.append(val)
+            out.append(literal)
+        return ''.join(out)
+
+@functools.lru_cache(maxsize=None)
+def compile_template(source, name='template'):
+    return Template(source, name)
+
 # ==========================================
 # 3. PAGE RENDERER
 # ==========================================
@@ -177,132 +387,123 @@ def build_footer_grid(config):
     html += '</div>'
     
     return html
-def render_page(template, config, page_data, theme_override=None):
-    s = config.get('site_settings', {})
-    # MERGE LOGIC: Use Base Theme as default, then overwrite with League Theme
-    base_theme = config.get('theme', {}).copy()
-    if theme_override:
-        base_theme.update(theme_override)
-    t = base_theme
-    
-    m = config.get('menus', {})
-    
-    html = template
-    
-    # --- THEME DEFAULTS ---
-    defaults = {
-        'brand_primary': '#D00000', 'brand_dark': '#8a0000', 'accent_gold': '#FFD700', 'status_green': '#22c55e',
-        'bg_body': '#050505', 'bg_panel': '#1e293b', 'bg_glass': 'rgba(30, 41, 59, 0.7)',
-        'text_main': '#f1f5f9', 'text_muted': '#94a3b8', 'border_color': '#334155', 'scrollbar_thumb_color': '#475569',
-        'font_family_base': 'system-ui, -apple-system, sans-serif', 'font_family_headings': 'inherit',
-        'base_font_size': '14px', 'base_line_height': '1.5',
-        'league_card_bg': 'rgba(30, 41, 59, 0.5)',
-        'league_card_text': '#f1f5f9',
-        'static_h1_color': '#f1f5f9',
-        'static_h1_align': 'left',
-        'league_card_border_width': '1', 
-        'league_card_border_color': '#334155',
-        'league_card_radius': '6',
-        'static_h1_border_width': '1', 
-        'static_h1_border_color': '#334155',
-        'sys_status_visible': True,
-        'sys_status_text_color': '#22c55e',
-        'sys_status_bg_color': 'rgba(34, 197, 94, 0.1)',
-        'sys_status_border_color': 'rgba(34, 197, 94, 0.2)',
-        'sys_status_border_width': '1',
-        'sys_status_radius': '20',
-        'sys_status_dot_color': '#22c55e',
-        'sys_status_dot_size': '8',
-        'league_card_hover_bg': '#1e293b',
-        'league_card_hover_text': '#ffffff',
-        'league_card_hover_border_color': '#D00000',
-        'container_max_width': '1100px', 'border_radius_base': '6px', 'button_border_radius': '4px',
-        'header_max_width': '1100px', 'hero_pill_radius': '50px', 'card_shadow': '0 4px 6px -1px rgba(0,0,0,0.1)',
-        'header_bg': 'rgba(5, 5, 5, 0.8)', 'header_text_color': '#f1f5f9', 'header_link_active_color': '#D00000',
-        'header_border_bottom': '1px solid #334155', 'logo_p1_color': '#f1f5f9', 'logo_p2_color': '#D00000',
-        'logo_image_size': '40px', 'header_layout': 'standard', 'header_icon_pos': 'left',
-        'header_link_hover_color': '#ffffff', 'header_highlight_color': '#FFD700', 'header_highlight_hover': '#ffea70',
-        'hero_bg_style': 'solid', 'hero_bg_solid': '#1a0505', 'hero_gradient_start': '#1a0505', 'hero_gradient_end': '#000000',
-        'hero_h1_color': '#ffffff', 'hero_intro_color': '#94a3b8',
-        'hero_pill_bg': 'rgba(255,255,255,0.05)', 'hero_pill_text': '#f1f5f9', 'hero_pill_border': 'rgba(255,255,255,0.1)',
-        'hero_pill_hover_bg': '#D00000', 'hero_pill_hover_text': '#ffffff', 'hero_pill_hover_border': '#D00000',
-        'hero_layout_mode': 'full', 'hero_content_align': 'center', 'hero_menu_visible': 'flex',
-        'hero_box_width': '1000px', 'hero_border_width': '1', 'hero_border_color': '#334155',
-        'hero_border_top': False, 'hero_border_left': False, 'hero_border_right': False,
-        'text_sys_status': 'System Status: Online',
-        'hero_main_border_pos': 'themeHeroMainBorderPos', 'hero_main_border_width': 'themeHeroMainBorderWidth',
-        'hero_main_border_color': 'themeHeroMainBorderColor', 'hero_box_border_width': '1', 'hero_box_border_color': '#334155',
-        'hero_border_bottom_box': False,
-        'footer_columns': '2',
-        # ... existing defaults ...
-        'watch_sidebar_swap': False,
-        'watch_show_ad1': True, 'watch_show_discord': True, 'watch_show_ad2': True,
-        'watch_discord_order': 'middle',
-        'chat_header_bg': 'rgba(0,0,0,0.4)', 'chat_header_text': '#ffffff',
-        'chat_dot_color': '#22c55e', 'chat_dot_size': '6px',
-        'chat_overlay_bg': 'rgba(15, 23, 42, 0.6)', 'chat_input_bg': '#000000',
-        'chat_input_text': '#ffffff',
-        'watch_table_head_bg': 'rgba(255,255,255,0.03)', 'watch_table_body_bg': '#1e293b',
-        'watch_table_border': '#334155', 'watch_table_radius': '6px',
-        'watch_team_color': '#ffffff', 'watch_vs_color': 'rgba(255,255,255,0.1)',
-        'watch_team_size': '1.4rem', 'watch_vs_size': '2rem',
-        'watch_btn_bg': '#D00000', 'watch_btn_text': '#ffffff',
-        'watch_btn_disabled_bg': '#1e293b', 'watch_btn_disabled_text': '#94a3b8',
-        'watch_info_btn_bg': '#1e293b', 'watch_info_btn_text': '#ffffff',
-        'watch_server_active_bg': '#D00000', 'watch_server_text': '#94a3b8',
-        'watch_discord_title': 'Join Discord', 'watch_discord_btn_text': 'Join',
-        'chat_header_title': 'Live Chat', 'chat_join_btn_text': 'Join Room',
-        'watch_btn_label': 'Watch Live Stream', 'watch_btn_disabled_label': 'Stream Starts Soon',
-        'watch_info_btn_label': 'View Match Info',
-        'sec_border_live_width': '1', 'sec_border_live_color': '#334155',
-        'sec_border_upcoming_width': '1', 'sec_border_upcoming_color': '#334155',
-        'sec_border_wildcard_width': '1', 'sec_border_wildcard_color': '#334155',
-        'sec_border_leagues_width': '1', 'sec_border_leagues_color': '#334155',
-        'sec_border_grouped_width': '1', 'sec_border_grouped_color': '#334155',
-        'match_row_bg': '#1e293b', 'match_row_border': '#334155', 
-        'match_row_live_border_left': '4px solid #22c55e', 'match_row_live_bg_start': 'rgba(34, 197, 94, 0.1)',
-        'match_row_live_bg_end': 'transparent', 'match_row_hover_border': '#D00000', 'match_row_hover_transform': 'translateY(-2px)',
-        'match_row_hover_bg': '#1e293b', 'match_row_time_main_color': '#f1f5f9', 'match_row_time_sub_color': '#94a3b8',
-        'match_row_live_text_color': '#22c55e', 'match_row_league_tag_color': '#94a3b8', 'match_row_team_name_color': '#f1f5f9',
-        'match_row_btn_watch_bg': '#D00000', 'match_row_btn_watch_text': '#ffffff', 
-        'match_row_btn_watch_hover_bg': '#b91c1c', 'match_row_btn_watch_hover_transform': 'scale(1.05)',
-        'match_row_hd_badge_bg': 'rgba(0,0,0,0.3)', 'match_row_hd_badge_border': 'rgba(255,255,255,0.2)', 'match_row_hd_badge_text': '#facc15',
-        'match_row_btn_notify_bg': 'transparent', 'match_row_btn_notify_border': '#334155', 'match_row_btn_notify_text': '#94a3b8',
-        'match_row_btn_notify_active_bg': '#22c55e', 'match_row_btn_notify_active_border': '#22c55e', 'match_row_btn_notify_active_text': '#ffffff',
-        'match_row_btn_copy_link_color': '#64748b', 'match_row_btn_copy_link_hover_color': '#D00000',
-        'footer_bg_start': '#0f172a', 'footer_bg_end': '#020617', 'footer_border_top': '1px solid #334155',
-        'footer_heading_color': '#94a3b8', 'footer_link_color': '#64748b', 'footer_link_hover_color': '#f1f5f9',
-        'footer_link_hover_transform': 'translateX(5px)', 'footer_copyright_color': '#475569', 'footer_desc_color': '#64748b',
-        'social_sidebar_bg': 'rgba(15, 23, 42, 0.8)', 'social_sidebar_border': '#334155', 'social_sidebar_shadow': '0 4px 10px rgba(0,0,0,0.3)',
-        'social_btn_bg': 'rgba(30, 41, 59, 0.8)', 'social_btn_border': '#334155', 'social_btn_color': '#94a3b8',
-        'social_btn_hover_bg': '#1e293b', 'social_btn_hover_border': '#D00000', 'social_btn_hover_transform': 'translateX(5px)',
-        'social_count_color': '#64748b', 'mobile_footer_bg': 'rgba(5, 5, 5, 0.9)', 'mobile_footer_border_top': '1px solid #334155',
-        'mobile_footer_shadow': '0 -4px 10px rgba(0,0,0,0.5)', 'copy_toast_bg': '#22c55e', 'copy_toast_text': '#ffffff', 'copy_toast_border': '#16a34a',
-        'back_to_top_bg': '#D00000', 'back_to_top_icon_color': '#ffffff', 'back_to_top_shadow': '0 4px 10px rgba(208,0,0,0.4)',
-        'sys_status_dot_color': '#22c55e', 'sys_status_bg': 'rgba(34, 197, 94, 0.1)', 'sys_status_border': 'rgba(34, 197, 94, 0.2)', 'sys_status_text': '#22c55e',
-        'skeleton_gradient_start': '#1e293b', 'skeleton_gradient_mid': '#334155', 'skeleton_gradient_end': '#1e293b', 'skeleton_border_color': '#334155',
-        'text_wildcard_title': '', 'text_top_upcoming_title': '', 'logo_image_shadow_color': 'rgba(208, 0, 0, 0.3)',
-        'button_shadow_color': 'rgba(0,0,0,0.2)', 'show_more_btn_bg': '#1e293b', 'show_more_btn_border': '#334155', 'show_more_btn_text': '#94a3b8',
-        'show_more_btn_hover_bg': '#D00000', 'show_more_btn_hover_border': '#D00000', 'show_more_btn_hover_text': '#ffffff',
-        'league_card_bg': 'rgba(30, 41, 59, 0.5)', 'league_card_border': '#334155', 'league_card_text': '#f1f5f9',
-        'league_card_hover_bg': '#1e293b', 'league_card_hover_border': '#D00000', 'footer_brand_color': '#ffffff',
-        'mobile_footer_btn_active_bg': 'rgba(255,255,255,0.1)', 'social_telegram_color': '#0088cc', 'social_whatsapp_color': '#25D366',
-        'social_reddit_color': '#FF4500', 'social_twitter_color': '#1DA1F2', 'social_btn_hover_shadow_color': 'rgba(0,0,0,0.3)',
-        'footer_grid_columns': '1fr 1fr', 'footer_text_align_mobile': 'left', 'footer_grid_columns_desktop': '1fr 1fr 1fr',
-        'footer_text_align_desktop': 'left', 'footer_last_col_align_desktop': 'right', 'social_desktop_top': '50%', 'social_desktop_left': '0',
-        'social_desktop_scale': '1.0', 'mobile_footer_height': '60px', 'show_more_btn_radius': '30px', 'back_to_top_radius': '50%',
-        'back_to_top_size': '40px', 'section_logo_size': '24px', 'text_live_section_title': 'Trending Live',
-        'text_show_more': 'Show More', 'text_watch_btn': 'WATCH', 'text_hd_badge': 'HD', 'text_section_link': 'View All',
-        'wildcard_category': '', 'text_section_prefix': 'Upcoming',
-        'sec_border_league_upcoming_width': '1', 'sec_border_league_upcoming_color': '#334155',
-        'article_bg': 'transparent', 'article_text': '#94a3b8', 'article_line_height': '1.6',
-        'article_bullet_color': '#D00000', 'article_link_color': '#D00000',
-        'article_h2_color': '#f1f5f9', 'article_h2_border_width': '0', 'article_h2_border_color': '#334155',
-        'article_h3_color': '#f1f5f9', 'article_h4_color': '#cbd5e1'
-    }
 
+# --- THEME DEFAULTS ---
+THEME_DEFAULTS = {
+    'brand_primary': '#D00000', 'brand_dark': '#8a0000', 'accent_gold': '#FFD700', 'status_green': '#22c55e',
+    'bg_body': '#050505', 'bg_panel': '#1e293b', 'bg_glass': 'rgba(30, 41, 59, 0.7)',
+    'text_main': '#f1f5f9', 'text_muted': '#94a3b8', 'border_color': '#334155', 'scrollbar_thumb_color': '#475569',
+    'font_family_base': 'system-ui, -apple-system, sans-serif', 'font_family_headings': 'inherit',
+    'base_font_size': '14px', 'base_line_height': '1.5',
+    'league_card_bg': 'rgba(30, 41, 59, 0.5)',
+    'league_card_text': '#f1f5f9',
+    'static_h1_color': '#f1f5f9',
+    'static_h1_align': 'left',
+    'league_card_border_width': '1', 
+    'league_card_border_color': '#334155',
+    'league_card_radius': '6',
+    'static_h1_border_width': '1', 
+    'static_h1_border_color': '#334155',
+    'sys_status_visible': True,
+    'sys_status_text_color': '#22c55e',
+    'sys_status_bg_color': 'rgba(34, 197, 94, 0.1)',
+    'sys_status_border_color': 'rgba(34, 197, 94, 0.2)',
+    'sys_status_border_width': '1',
+    'sys_status_radius': '20',
+    'sys_status_dot_color': '#22c55e',
+    'sys_status_dot_size': '8',
+    'league_card_hover_bg': '#1e293b',
+    'league_card_hover_text': '#ffffff',
+    'league_card_hover_border_color': '#D00000',
+    'container_max_width': '1100px', 'border_radius_base': '6px', 'button_border_radius': '4px',
+    'header_max_width': '1100px', 'hero_pill_radius': '50px', 'card_shadow': '0 4px 6px -1px rgba(0,0,0,0.1)',
+    'header_bg': 'rgba(5, 5, 5, 0.8)', 'header_text_color': '#f1f5f9', 'header_link_active_color': '#D00000',
+    'header_border_bottom': '1px solid #334155', 'logo_p1_color': '#f1f5f9', 'logo_p2_color': '#D00000',
+    'logo_image_size': '40px', 'header_layout': 'standard', 'header_icon_pos': 'left',
+    'header_link_hover_color': '#ffffff', 'header_highlight_color': '#FFD700', 'header_highlight_hover': '#ffea70',
+    'hero_bg_style': 'solid', 'hero_bg_solid': '#1a0505', 'hero_gradient_start': '#1a0505', 'hero_gradient_end': '#000000',
+    'hero_h1_color': '#ffffff', 'hero_intro_color': '#94a3b8',
+    'hero_pill_bg': 'rgba(255,255,255,0.05)', 'hero_pill_text': '#f1f5f9', 'hero_pill_border': 'rgba(255,255,255,0.1)',
+    'hero_pill_hover_bg': '#D00000', 'hero_pill_hover_text': '#ffffff', 'hero_pill_hover_border': '#D00000',
+    'hero_layout_mode': 'full', 'hero_content_align': 'center', 'hero_menu_visible': 'flex',
+    'hero_box_width': '1000px', 'hero_border_width': '1', 'hero_border_color': '#334155',
+    'hero_border_top': False, 'hero_border_left': False, 'hero_border_right': False,
+    'text_sys_status': 'System Status: Online',
+    'hero_main_border_pos': 'themeHeroMainBorderPos', 'hero_main_border_width': 'themeHeroMainBorderWidth',
+    'hero_main_border_color': 'themeHeroMainBorderColor', 'hero_box_border_width': '1', 'hero_box_border_color': '#334155',
+    'hero_border_bottom_box': False,
+    'footer_columns': '2',
+    # ... existing defaults ...
+    'watch_sidebar_swap': False,
+    'watch_show_ad1': True, 'watch_show_discord': True, 'watch_show_ad2': True,
+    'watch_discord_order': 'middle',
+    'chat_header_bg': 'rgba(0,0,0,0.4)', 'chat_header_text': '#ffffff',
+    'chat_dot_color': '#22c55e', 'chat_dot_size': '6px',
+    'chat_overlay_bg': 'rgba(15, 23, 42, 0.6)', 'chat_input_bg': '#000000',
+    'chat_input_text': '#ffffff',
+    'watch_table_head_bg': 'rgba(255,255,255,0.03)', 'watch_table_body_bg': '#1e293b',
+    'watch_table_border': '#334155', 'watch_table_radius': '6px',
+    'watch_team_color': '#ffffff', 'watch_vs_color': 'rgba(255,255,255,0.1)',
+    'watch_team_size': '1.4rem', 'watch_vs_size': '2rem',
+    'watch_btn_bg': '#D00000', 'watch_btn_text': '#ffffff',
+    'watch_btn_disabled_bg': '#1e293b', 'watch_btn_disabled_text': '#94a3b8',
+    'watch_info_btn_bg': '#1e293b', 'watch_info_btn_text': '#ffffff',
+    'watch_server_active_bg': '#D00000', 'watch_server_text': '#94a3b8',
+    'watch_discord_title': 'Join Discord', 'watch_discord_btn_text': 'Join',
+    'chat_header_title': 'Live Chat', 'chat_join_btn_text': 'Join Room',
+    'watch_btn_label': 'Watch Live Stream', 'watch_btn_disabled_label': 'Stream Starts Soon',
+    'watch_info_btn_label': 'View Match Info',
+    'sec_border_live_width': '1', 'sec_border_live_color': '#334155',
+    'sec_border_upcoming_width': '1', 'sec_border_upcoming_color': '#334155',
+    'sec_border_wildcard_width': '1', 'sec_border_wildcard_color': '#334155',
+    'sec_border_leagues_width': '1', 'sec_border_leagues_color': '#334155',
+    'sec_border_grouped_width': '1', 'sec_border_grouped_color': '#334155',
+    'match_row_bg': '#1e293b', 'match_row_border': '#334155', 
+    'match_row_live_border_left': '4px solid #22c55e', 'match_row_live_bg_start': 'rgba(34, 197, 94, 0.1)',
+    'match_row_live_bg_end': 'transparent', 'match_row_hover_border': '#D00000', 'match_row_hover_transform': 'translateY(-2px)',
+    'match_row_hover_bg': '#1e293b', 'match_row_time_main_color': '#f1f5f9', 'match_row_time_sub_color': '#94a3b8',
+    'match_row_live_text_color': '#22c55e', 'match_row_league_tag_color': '#94a3b8', 'match_row_team_name_color': '#f1f5f9',
+    'match_row_btn_watch_bg': '#D00000', 'match_row_btn_watch_text': '#ffffff', 
+    'match_row_btn_watch_hover_bg': '#b91c1c', 'match_row_btn_watch_hover_transform': 'scale(1.05)',
+    'match_row_hd_badge_bg': 'rgba(0,0,0,0.3)', 'match_row_hd_badge_border': 'rgba(255,255,255,0.2)', 'match_row_hd_badge_text': '#facc15',
+    'match_row_btn_notify_bg': 'transparent', 'match_row_btn_notify_border': '#334155', 'match_row_btn_notify_text': '#94a3b8',
+    'match_row_btn_notify_active_bg': '#22c55e', 'match_row_btn_notify_active_border': '#22c55e', 'match_row_btn_notify_active_text': '#ffffff',
+    'match_row_btn_copy_link_color': '#64748b', 'match_row_btn_copy_link_hover_color': '#D00000',
+    'footer_bg_start': '#0f172a', 'footer_bg_end': '#020617', 'footer_border_top': '1px solid #334155',
+    'footer_heading_color': '#94a3b8', 'footer_link_color': '#64748b', 'footer_link_hover_color': '#f1f5f9',
+    'footer_link_hover_transform': 'translateX(5px)', 'footer_copyright_color': '#475569', 'footer_desc_color': '#64748b',
+    'social_sidebar_bg': 'rgba(15, 23, 42, 0.8)', 'social_sidebar_border': '#334155', 'social_sidebar_shadow': '0 4px 10px rgba(0,0,0,0.3)',
+    'social_btn_bg': 'rgba(30, 41, 59, 0.8)', 'social_btn_border': '#334155', 'social_btn_color': '#94a3b8',
+    'social_btn_hover_bg': '#1e293b', 'social_btn_hover_border': '#D00000', 'social_btn_hover_transform': 'translateX(5px)',
+    'social_count_color': '#64748b', 'mobile_footer_bg': 'rgba(5, 5, 5, 0.9)', 'mobile_footer_border_top': '1px solid #334155',
+    'mobile_footer_shadow': '0 -4px 10px rgba(0,0,0,0.5)', 'copy_toast_bg': '#22c55e', 'copy_toast_text': '#ffffff', 'copy_toast_border': '#16a34a',
+    'back_to_top_bg': '#D00000', 'back_to_top_icon_color': '#ffffff', 'back_to_top_shadow': '0 4px 10px rgba(208,0,0,0.4)',
+    'sys_status_dot_color': '#22c55e', 'sys_status_bg': 'rgba(34, 197, 94, 0.1)', 'sys_status_border': 'rgba(34, 197, 94, 0.2)', 'sys_status_text': '#22c55e',
+    'skeleton_gradient_start': '#1e293b', 'skeleton_gradient_mid': '#334155', 'skeleton_gradient_end': '#1e293b', 'skeleton_border_color': '#334155',
+    'text_wildcard_title': '', 'text_top_upcoming_title': '', 'logo_image_shadow_color': 'rgba(208, 0, 0, 0.3)',
+    'button_shadow_color': 'rgba(0,0,0,0.2)', 'show_more_btn_bg': '#1e293b', 'show_more_btn_border': '#334155', 'show_more_btn_text': '#94a3b8',
+    'show_more_btn_hover_bg': '#D00000', 'show_more_btn_hover_border': '#D00000', 'show_more_btn_hover_text': '#ffffff',
+    'league_card_bg': 'rgba(30, 41, 59, 0.5)', 'league_card_border': '#334155', 'league_card_text': '#f1f5f9',
+    'league_card_hover_bg': '#1e293b', 'league_card_hover_border': '#D00000', 'footer_brand_color': '#ffffff',
+    'mobile_footer_btn_active_bg': 'rgba(255,255,255,0.1)', 'social_telegram_color': '#0088cc', 'social_whatsapp_color': '#25D366',
+    'social_reddit_color': '#FF4500', 'social_twitter_color': '#1DA1F2', 'social_btn_hover_shadow_color': 'rgba(0,0,0,0.3)',
+    'footer_grid_columns': '1fr 1fr', 'footer_text_align_mobile': 'left', 'footer_grid_columns_desktop': '1fr 1fr 1fr',
+    'footer_text_align_desktop': 'left', 'footer_last_col_align_desktop': 'right', 'social_desktop_top': '50%', 'social_desktop_left': '0',
+    'social_desktop_scale': '1.0', 'mobile_footer_height': '60px', 'show_more_btn_radius': '30px', 'back_to_top_radius': '50%',
+    'back_to_top_size': '40px', 'section_logo_size': '24px', 'text_live_section_title': 'Trending Live',
+    'text_show_more': 'Show More', 'text_watch_btn': 'WATCH', 'text_hd_badge': 'HD', 'text_section_link': 'View All',
+    'wildcard_category': '', 'text_section_prefix': 'Upcoming',
+    'sec_border_league_upcoming_width': '1', 'sec_border_league_upcoming_color': '#334155',
+    'article_bg': 'transparent', 'article_text': '#94a3b8', 'article_line_height': '1.6',
+    'article_bullet_color': '#D00000', 'article_link_color': '#D00000',
+    'article_h2_color': '#f1f5f9', 'article_h2_border_width': '0', 'article_h2_border_color': '#334155',
+    'article_h3_color': '#f1f5f9', 'article_h4_color': '#cbd5e1'
+}
+
+def resolve_theme(t):
+    """Apply THEME_DEFAULTS and the derived CSS values to a merged theme dict."""
     theme = {}
-    for k, v in defaults.items():
+    for k, v in THEME_DEFAULTS.items():
         val = t.get(k)
         if k in ['border_radius_base', 'container_max_width', 'base_font_size', 'logo_image_size', 'button_border_radius', 
                  'show_more_btn_radius', 'back_to_top_size', 'header_max_width', 'section_logo_size', 'hero_pill_radius', 'hero_box_width', 'hero_box_border_width', 'hero_main_border_width']:
@@ -348,20 +549,24 @@ def render_page(template, config, page_data, theme_override=None):
     
     # 2. ENSURE RADIUS HAS UNIT
     theme['league_card_radius'] = ensure_unit(theme.get('league_card_radius'), 'px')
+    return theme
 
+def build_theme_slots(theme):
+    """Template slots that depend only on the resolved theme."""
+    ctx = {}
     for key, val in theme.items():
         if isinstance(val, bool):
             val = str(val).lower()
-        html = html.replace(f"{{{{THEME_{key.upper()}}}}}", str(val))
-        grid_cols = str(theme.get('footer_columns', '2'))
-    html = html.replace('{{THEME_FOOTER_COLS}}', f'repeat({grid_cols}, 1fr)')
+        ctx[f"THEME_{key.upper()}"] = str(val)
+    grid_cols = str(theme.get('footer_columns', '2'))
+    ctx['THEME_FOOTER_COLS'] = f'repeat({grid_cols}, 1fr)'
 
     # --- LAYOUT/HERO LOGIC ---
     h_layout = theme.get('header_layout', 'standard')
     h_icon = theme.get('header_icon_pos', 'left')
     header_class = f"h-layout-{h_layout}"
     if h_layout == 'center': header_class += f" h-icon-{h_icon}"
-    html = html.replace('{{HEADER_CLASSES}}', header_class)
+    ctx['HEADER_CLASSES'] = header_class
 
     hero_style = theme.get('hero_bg_style', 'solid')
     hero_css = ""
@@ -379,10 +584,10 @@ def render_page(template, config, page_data, theme_override=None):
     intro_margin = '0 auto' if align == 'center' else ('0' if align == 'left' else '0 0 0 auto')
     menu_justify = align_items
 
-    html = html.replace('{{THEME_HERO_TEXT_ALIGN}}', align)
-    html = html.replace('{{THEME_HERO_ALIGN_ITEMS}}', align_items)
-    html = html.replace('{{THEME_HERO_INTRO_MARGIN}}', intro_margin)
-    html = html.replace('{{THEME_HERO_MENU_JUSTIFY}}', menu_justify)
+    ctx['THEME_HERO_TEXT_ALIGN'] = align
+    ctx['THEME_HERO_ALIGN_ITEMS'] = align_items
+    ctx['THEME_HERO_INTRO_MARGIN'] = intro_margin
+    ctx['THEME_HERO_MENU_JUSTIFY'] = menu_justify
 
     h_mode = theme.get('hero_layout_mode', 'full')
     box_b_str = f"{ensure_unit(theme.get('hero_box_border_width'), 'px')} solid {theme.get('hero_box_border_color')}"
@@ -407,127 +612,245 @@ def render_page(template, config, page_data, theme_override=None):
         if main_pos == 'full': hero_outer_style += f" {main_border_str}"
         hero_inner_style = "max-width: var(--container-max-width); margin: 0 auto;"
 
-    html = html.replace('{{HERO_OUTER_STYLE}}', hero_outer_style)
-    html = html.replace('{{HERO_INNER_STYLE}}', hero_inner_style)
-    html = html.replace('{{HERO_MENU_DISPLAY}}', theme.get('hero_menu_visible', 'flex'))
-    html = html.replace('{{JS_THEME_CONFIG}}', json.dumps(theme))
-    html = html.replace('{{WILDCARD_CATEGORY}}', theme.get('wildcard_category', ''))
+    ctx['HERO_OUTER_STYLE'] = hero_outer_style
+    ctx['HERO_INNER_STYLE'] = hero_inner_style
+    ctx['HERO_MENU_DISPLAY'] = theme.get('hero_menu_visible', 'flex')
+    ctx['JS_THEME_CONFIG'] = json.dumps(theme)
+    ctx['WILDCARD_CATEGORY'] = theme.get('wildcard_category', '')
     
     # Text Replacements
-    html = html.replace('{{TEXT_LIVE_SECTION_TITLE}}', theme.get('text_live_section_title', 'Trending Live'))
-    html = html.replace('{{TEXT_SHOW_MORE}}', theme.get('text_show_more', 'Show More'))
-    html = html.replace('{{TEXT_WATCH_BTN}}', theme.get('text_watch_btn', 'WATCH'))
-    html = html.replace('{{TEXT_HD_BADGE}}', theme.get('text_hd_badge', 'HD'))
-    html = html.replace('{{TEXT_SECTION_LINK}}', theme.get('text_section_link', 'View All'))
-    html = html.replace('{{TEXT_SECTION_PREFIX}}', theme.get('text_section_prefix', 'Upcoming'))
-    html = html.replace('{{TEXT_WILDCARD_TITLE}}', theme.get('text_wildcard_title', ''))
-    html = html.replace('{{THEME_TEXT_SYS_STATUS}}', theme.get('text_sys_status', 'System Status: Online'))
-    html = html.replace('{{TEXT_TOP_UPCOMING_TITLE}}', theme.get('text_top_upcoming_title', ''))
-
-    html = html.replace('{{BRAND_PRIMARY}}', theme.get('brand_primary'))
-    html = html.replace('{{API_URL}}', s.get('api_url', ''))
-    country = s.get('target_country', 'US')
-    html = html.replace('{{TARGET_COUNTRY}}', country)
-    html = html.replace('lang="en"', f'lang="en-GB"' if country == 'UK' else 'lang="en-US"')
+    ctx['TEXT_LIVE_SECTION_TITLE'] = theme.get('text_live_section_title', 'Trending Live')
+    ctx['TEXT_SHOW_MORE'] = theme.get('text_show_more', 'Show More')
+    ctx['TEXT_WATCH_BTN'] = theme.get('text_watch_btn', 'WATCH')
+    ctx['TEXT_HD_BADGE'] = theme.get('text_hd_badge', 'HD')
+    ctx['TEXT_SECTION_LINK'] = theme.get('text_section_link', 'View All')
+    ctx['TEXT_SECTION_PREFIX'] = theme.get('text_section_prefix', 'Upcoming')
+    ctx['TEXT_WILDCARD_TITLE'] = theme.get('text_wildcard_title', '')
+    ctx['TEXT_TOP_UPCOMING_TITLE'] = theme.get('text_top_upcoming_title', '')
+
+    ctx['BRAND_PRIMARY'] = theme.get('brand_primary')
+    return ctx
+
+class BuildContext:
+    """
+    Per-build cache of everything that is identical across pages: the resolved
+    theme variants, the site-wide slots and the serialized JSON maps. Each is
+    computed on first use and reused by every page of the build.
+    """
+    THEME_VARIANTS = ('theme', 'theme_page', 'theme_watch', 'theme_league')
+
+    def __init__(self, config, precompress=False, resolved=None):
+        self.config = config
+        self.precompress = precompress
+        self._themes = {}
+        self._theme_slots = {}
+        self._site_slots = None
+        self._image_map_shards = None
+        self._input_digests = {}
+        self.published = set()    # URLs of the JSON assets published by this build
+        if resolved:
+            # Site slots resolved by the parent build (render workers): no map assets published again
+            self._site_slots = resolved['site_slots']
+            self.site_name, self.domain, self.og_image = resolved['shared']
+
+    def publish(self, data, stem):
+        url = publish_json_asset(data, stem, self.precompress)
+        self.published.add(url)
+        return url
+
+    def resolved(self):
+        """The resolved site slots and shared values, for BuildContext(config, resolved=...) in a render worker."""
+        return {"site_slots": self.site_slots(), "shared": (self.site_name, self.domain, self.og_image)}
+
+    def raw_theme(self, variant='theme'):
+        # MERGE LOGIC: Use Base Theme as default, then overwrite with the variant (fallback: base)
+        base_theme = self.config.get('theme', {}).copy()
+        if variant != 'theme':
+            base_theme.update(self.config.get(variant) or self.config.get('theme', {}))
+        return base_theme
+
+    def theme(self, variant='theme'):
+        if variant not in self._themes:
+            self._themes[variant] = resolve_theme(self.raw_theme(variant))
+        return self._themes[variant]
+
+    def theme_slots(self, variant='theme'):
+        if variant not in self._theme_slots:
+            ctx = build_theme_slots(self.theme(variant))
+            # Footer grid reads the merged raw theme plus the generated logo
+            self.site_slots()
+            temp_config = self.config.copy()
+            temp_config['theme'] = self.raw_theme(variant)
+            ctx['FOOTER_GRID_CONTENT'] = build_footer_grid(temp_config)
+            self._theme_slots[variant] = ctx
+        return self._theme_slots[variant]
+
+    def site_slots(self):
+        if self._site_slots is not None:
+            return self._site_slots
+        config = self.config
+        s = config.get('site_settings', {})
+        m = config.get('menus', {})
+        ctx = {}
+
+        ctx['API_URL'] = s.get('api_url', '')
+        country = s.get('target_country', 'US')
+        ctx['TARGET_COUNTRY'] = country
+        ctx['HTML_LANG'] = f'lang="en-GB"' if country == 'UK' else 'lang="en-US"'
     
-    p1 = s.get('title_part_1', 'Stream')
-    p2 = s.get('title_part_2', 'East')
-    site_name = f"{p1}{p2}"
-    html = html.replace('{{SITE_NAME}}', site_name)
-    domain = s.get('domain', 'example.com')
+        p1 = s.get('title_part_1', 'Stream')
+        p2 = s.get('title_part_2', 'East')
+        site_name = f"{p1}{p2}"
+        ctx['SITE_NAME'] = site_name
+        domain = s.get('domain', 'example.com')
     
-    # Logo Logic
-    og_image = s.get('logo_url', '') or ""
-    if og_image and not og_image.startswith('http'): og_image = f"https://{domain.rstrip('/')}/{og_image.lstrip('/')}"
-    og_mime = "image/png"
-    if og_image.lower().endswith('.webp'): og_mime = "image/webp"
-    elif og_image.lower().endswith(('.jpg', '.jpeg')): og_mime = "image/jpeg"
+        # Logo Logic
+        og_image = s.get('logo_url', '') or ""
+        if og_image and not og_image.startswith('http'): og_image = f"https://{domain.rstrip('/')}/{og_image.lstrip('/')}"
+        og_mime = "image/png"
+        if og_image.lower().endswith('.webp'): og_mime = "image/webp"
+        elif og_image.lower().endswith(('.jpg', '.jpeg')): og_mime = "image/jpeg"
     
-    html = html.replace('{{OG_IMAGE}}', og_image)
-    html = html.replace('{{OG_MIME}}', og_mime)
-    logo_html = f'<div class="logo-text">{p1}<span>{p2}</span></div>'
-    if s.get('logo_url'): logo_html = f'<img src="{s.get("logo_url")}" class="logo-img" alt="{site_name} Logo" fetchpriority="high"> {logo_html}'
-    config['_generated_logo_html'] = logo_html      # <--- FIX: Remove spaces to align with 'if'
-    html = html.replace('{{LOGO_HTML}}', logo_html)
-    html = html.replace('{{DOMAIN}}', domain)
-    p_live = s.get('param_live', 'stream')
-    p_info = s.get('param_info', 'info')
+        ctx['OG_IMAGE'] = og_image
+        ctx['OG_MIME'] = og_mime
+        logo_html = f'<div class="logo-text">{p1}<span>{p2}</span></div>'
+        if s.get('logo_url'): logo_html = f'<img src="{s.get("logo_url")}" class="logo-img" alt="{site_name} Logo" fetchpriority="high"> {logo_html}'
+        config['_generated_logo_html'] = logo_html      # <--- FIX: Remove spaces to align with 'if'
+        ctx['LOGO_HTML'] = logo_html
+        ctx['DOMAIN'] = domain
+        p_live = s.get('param_live', 'stream')
+        p_info = s.get('param_info', 'info')
     
-    html = html.replace('{{PARAM_LIVE}}', p_live)
-    html = html.replace('{{PARAM_INFO}}', p_info)
-    html = html.replace('{{FAVICON}}', s.get('favicon_url', ''))
+        ctx['PARAM_LIVE'] = p_live
+        ctx['PARAM_INFO'] = p_info
+        ctx['FAVICON'] = s.get('favicon_url', '')
 
-    html = html.replace('{{HEADER_MENU}}', build_menu_html(m.get('header', []), 'header'))
-    html = html.replace('{{HERO_PILLS}}', build_menu_html(m.get('hero', []), 'hero'))
+        ctx['HEADER_MENU'] = build_menu_html(m.get('header', []), 'header')
+        ctx['HERO_PILLS'] = build_menu_html(m.get('hero', []), 'hero')
     
-    auto_footer_leagues = []
-    priorities = config.get('sport_priorities', {}).get(country, {})
-    if priorities:
-        for name, data in sorted([item for item in priorities.items() if not item[0].startswith('_')], key=lambda x: x[1].get('score', 0), reverse=True):
-            if data.get('hasLink'): auto_footer_leagues.append({'title': name, 'url': f'/{normalize_key(name)}-streams/'})
-    html = html.replace('{{FOOTER_LEAGUES}}', build_menu_html(auto_footer_leagues, 'footer_leagues'))
+        auto_footer_leagues = []
+        priorities = config.get('sport_priorities', {}).get(country, {})
+        if priorities:
+            for name, data in sorted([item for item in priorities.items() if not item[0].startswith('_')], key=lambda x: x[1].get('score', 0), reverse=True):
+                if data.get('hasLink'): auto_footer_leagues.append({'title': name, 'url': f'/{normalize_key(name)}-streams/'})
+        ctx['FOOTER_LEAGUES'] = build_menu_html(auto_footer_leagues, 'footer_leagues')
 
-    html = html.replace('{{FOOTER_COPYRIGHT}}', s.get('footer_copyright', f"&copy; 2025 {domain}"))
+        ctx['FOOTER_COPYRIGHT'] = s.get('footer_copyright', f"&copy; 2025 {domain}")
+
+        # --- INJECTIONS (SERIALIZED ONCE PER BUILD) ---
+        ctx['JS_PRIORITIES'] = json.dumps(priorities)
     
-    # <--- FIX: Add indentation to this whole block
-    temp_config = config.copy()
-    if theme_override:
-        temp_config['theme'] = config.get('theme', {}).copy()
-        temp_config['theme'].update(theme_override)
+        social_data = config.get('social_sharing', {})
+        js_social = {"excluded": [x.strip() for x in social_data.get('excluded_pages', '').split(',') if x.strip()], "counts": social_data.get('counts', {})}
+        ctx['SHARE_CONFIG'] = f'const SHARE_CONFIG = {json.dumps(js_social)};'
+
+        # 1. LOAD LEAGUE MAP
+        league_map_data = load_json(LEAGUE_MAP_PATH)
+    
+        # 2. CREATE REVERSE MAP (Team -> League) SERVER SIDE
+        reverse_map = {}
+        if league_map_data:
+            for league_name, teams in league_map_data.items():
+                for team in teams:
+                    # Store as key: team-slug, value: League Name
+                    reverse_map[team] = league_name
+    
+        # Inject the REVERSED map instead of the raw map
+        ctx['JS_LEAGUE_MAP'] = json.dumps(reverse_map)
+        # The logo map is published once as a hashed file instead of inlined into every page
+        ctx['IMAGE_MAP_URL'] = self.publish(load_json(IMAGE_MAP_PATH), 'image_map')
+        # Build-time schedule snapshot: painted first, then reconciled with the live API
+        ctx['SCHEDULE_SNAPSHOT_URL'] = f"/{SCHEDULE_DIR}/all.json"
+        ctx['LOGO_PRELOAD'] = f'<link rel="preload" as="image" href="{s.get("logo_url")}" fetchpriority="high">' if s.get('logo_url') else ''
+        ctx['MAIN_CONTAINER_CLASSES'] = ctx['FOOTER_CLASSES'] = ''
+
+        # Shared values the per-page part of render_page needs
+        self.site_name, self.domain, self.og_image = site_name, domain, og_image
+        self._site_slots = ctx
+        return ctx
 
-    # 2. Build the Grid
-    footer_grid_html = build_footer_grid(temp_config)
-    html = html.replace('{{FOOTER_GRID_CONTENT}}', footer_grid_html)
-    # <--- End of fix
+    def input_digest(self, variant='theme'):
+        """
+        Hash of every build-wide input a page of this theme variant depends on:
+        the build code (CODE_FILES), the site config (minus pages and other theme variants),
+        the merged theme and the JSON maps. Per-page inputs are hashed on top.
+        """
+        if variant not in self._input_digests:
+            site_config = {k: v for k, v in self.config.items() if k != 'pages' and k not in self.THEME_VARIANTS}
+            maps = [file_digest(p) for p in (LEAGUE_MAP_PATH, IMAGE_MAP_PATH, IMAGE_MAP_SHARDS_PATH)]
+            self._input_digests[variant] = input_digest([file_digest(p) for p in CODE_FILES], site_config, variant, self.raw_theme(variant), maps)
+        return self._input_digests[variant]
+
+    def image_map_urls(self, page_filter):
+        """
+        Logo map files for a filtered (league/sport) page: the shared core plus
+        the shards whose league or sport the client-side filter would match.
+        Falls back to the full map when no shard matches (or none were generated).
+        """
+        if self._image_map_shards is None:
+            data = load_json(IMAGE_MAP_SHARDS_PATH)
+            self._image_map_shards = data if data.get('shards') else {}
+            if self._image_map_shards:
+                self._image_map_shards['core_url'] = self.publish(data.get('core', {}), 'image_map.core')
+        data = self._image_map_shards
+        if not data:
+            return [self.site_slots()['IMAGE_MAP_URL']]
+
+        # Same rule as the league template filter: exact, or substring for filters > 2 chars
+        key = normalize_key(page_filter)
+        loose = len(page_filter.strip()) > 2
+        teams, leagues = {}, {}
+        sprites = {"sheets": {}, "pos": {}}
+        for shard_name, shard in sorted(data['shards'].items()):
+            names = [shard_name] + [normalize_key(sp) for sp in shard.get('sports', [])]
+            if any(n == key or (loose and key and key in n) for n in names):
+                # Shards are in the compact format (image_map_codec); merged decoded, published re-encoded
+                part = decode(shard)
+                teams.update(part['teams'])
+                leagues.update(part['leagues'])
+                sprites['sheets'].update(part.get('sprites', {}).get('sheets', {}))
+                for logo, pos in part.get('sprites', {}).get('pos', {}).items():
+                    sprites['pos'].setdefault(logo, pos)
+        if not teams and not leagues:
+            return [self.site_slots()['IMAGE_MAP_URL']]
+        shard_url = self.publish(encode(teams, leagues, sprites), f'image_map.{key}')
+        return [data['core_url'], shard_url]
+
+def render_page(template, build, page_data, variant='theme', extra=None, slot_sizes=None):
+    theme = build.theme(variant)
+    ctx = dict(build.site_slots())
+    ctx.update(build.theme_slots(variant))
+    site_name, domain, og_image = build.site_name, build.domain, build.og_image
 
     layout = page_data.get('layout', 'page')
+    ctx['HEAD_CLOSE'] = '</head>'
     if layout == 'watch':
-        html = html.replace('{{META_TITLE}}', '').replace('{{META_DESC}}', '').replace('<link rel="canonical" href="{{CANONICAL_URL}}">', '')
-        html = html.replace('{{H1_TITLE}}', '').replace('{{HERO_TEXT}}', '').replace('{{DISPLAY_HERO}}', 'none')
-        html = html.replace('</head>', '<style>.hero, #live-section, #upcoming-container { display: none !important; }</style></head>')
+        ctx['META_TITLE'] = ctx['META_DESC'] = ctx['CANONICAL_LINK'] = ''
+        ctx['H1_TITLE'] = ctx['HERO_TEXT'] = ''
+        ctx['DISPLAY_HERO'] = 'none'
+        ctx['HEAD_CLOSE'] = '<style>.hero, #live-section, #upcoming-container { display: none !important; }</style></head>'
     else:
-        html = html.replace('{{META_TITLE}}', page_data.get('meta_title') or f"{site_name} - {page_data.get('title')}")
-        html = html.replace('{{META_DESC}}', page_data.get('meta_desc', ''))
-        html = html.replace('{{H1_TITLE}}', page_data.get('title', ''))
+        ctx['META_TITLE'] = page_data.get('meta_title') or f"{site_name} - {page_data.get('title')}"
+        ctx['META_DESC'] = page_data.get('meta_desc', '')
+        ctx['H1_TITLE'] = page_data.get('title', '')
         default_align = theme.get('static_h1_align', 'left') 
-        html = html.replace('{{H1_ALIGN}}', page_data.get('h1_align') or default_align)
-        html = html.replace('{{HERO_TEXT}}', page_data.get('hero_text') or page_data.get('meta_desc', ''))
+        ctx['H1_ALIGN'] = page_data.get('h1_align') or default_align
+        ctx['HERO_TEXT'] = page_data.get('hero_text') or page_data.get('meta_desc', '')
         canon = page_data.get('canonical_url', '') or (f"https://{domain}/{page_data.get('slug')}/" if page_data.get('slug') != 'home' else f"https://{domain}/")
-        html = html.replace('{{CANONICAL_URL}}', canon)
+        ctx['CANONICAL_URL'] = canon
+        ctx['CANONICAL_LINK'] = f'<link rel="canonical" href="{canon}">'
 
-    html = html.replace('{{META_KEYWORDS}}', f'<meta name="keywords" content="{page_data.get("meta_keywords")}">' if page_data.get('meta_keywords') else '')
+    ctx['META_KEYWORDS'] = f'<meta name="keywords" content="{page_data.get("meta_keywords")}">' if page_data.get('meta_keywords') else ''
     
     # FIX: Allow 'league' layout to show Hero and Match Sections
     if layout in ['home', 'league']: 
-        html = html.replace('{{DISPLAY_HERO}}', theme.get('display_hero', 'block'))
+        ctx['DISPLAY_HERO'] = theme.get('display_hero', 'block')
     elif layout != 'watch': 
         # Only hide sections for static pages (About, Contact, etc.)
-        html = html.replace('{{DISPLAY_HERO}}', 'none')
-        html = html.replace('</head>', '<style>#live-section, #upcoming-container { display: none !important; }</style></head>')
-
-    html = html.replace('{{ARTICLE_CONTENT}}', page_data.get('content', ''))
+        ctx['DISPLAY_HERO'] = 'none'
+        ctx['HEAD_CLOSE'] = '<style>#live-section, #upcoming-container { display: none !important; }</style></head>'
 
-    # --- INJECTIONS (OPTIMIZED) ---
-    html = html.replace('{{JS_PRIORITIES}}', json.dumps(priorities))
-    
-    social_data = config.get('social_sharing', {})
-    js_social = {"excluded": [x.strip() for x in social_data.get('excluded_pages', '').split(',') if x.strip()], "counts": social_data.get('counts', {})}
-    html = re.sub(r'const SHARE_CONFIG = \{.*?\};', f'const SHARE_CONFIG = {json.dumps(js_social)};', html, flags=re.DOTALL)
-
-    # 1. LOAD LEAGUE MAP
-    league_map_data = load_json(LEAGUE_MAP_PATH)
-    
-    # 2. CREATE REVERSE MAP (Team -> League) SERVER SIDE
-    reverse_map = {}
-    if league_map_data:
-        for league_name, teams in league_map_data.items():
-            for team in teams:
-                # Store as key: team-slug, value: League Name
-                reverse_map[team] = league_name
-    
-    # Inject the REVERSED map instead of the raw map
-    html = html.replace('{{JS_LEAGUE_MAP}}', json.dumps(reverse_map))
-    html = html.replace('{{JS_IMAGE_MAP}}', json.dumps(load_json(IMAGE_MAP_PATH)))
+    ctx['ARTICLE_CONTENT'] = page_data.get('content', '')
 
     # --- STATIC SCHEMAS ---
     schemas = []
@@ -584,21 +907,139 @@ def render_page(template, config, page_data, theme_override=None):
             "mainEntity": {"@id": f"{page_data.get('canonical_url')}#events"} 
         })
 
-    html = html.replace('{{SCHEMA_BLOCK}}', f'<script type="application/ld+json">{json.dumps({"@context": "https://schema.org", "@graph": schemas}, indent=2)}</script>' if schemas else '')
-    html = html.replace('{{LOGO_PRELOAD}}', f'<link rel="preload" as="image" href="{s.get("logo_url")}" fetchpriority="high">' if s.get('logo_url') else '')
-    html = html.replace('{{HEADER_CLASSES}}', '').replace('{{MAIN_CONTAINER_CLASSES}}', '').replace('{{FOOTER_CLASSES}}', '')
+    ctx['SCHEMA_BLOCK'] = f'<script type="application/ld+json">{json.dumps({"@context": "https://schema.org", "@graph": schemas}, indent=2)}</script>' if schemas else ''
+    # Page-specific injections fill slots the renderer does not own
+    for key, val in (extra or {}).items():
+        ctx.setdefault(key, val)
 
-    return html
+    if not isinstance(template, Template):
+        template = compile_template(template)
+    return template.render(ctx, slot_sizes)
+
+# --- BUILD PROFILE (--profile) ---
+class BuildProfile:
+    """
+    Wall time per build stage plus, per page, render/write time, output bytes
+    and the bytes each template slot contributed. Disabled profiles only keep
+    the (cheap) stage marks.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = []
+        self.pages = []
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """Close the stage that started at the previous mark."""
+        now = time.perf_counter()
+        self.stages.append([stage, now - self._last])
+        self._last = now
+
+    def add_page(self, out_path, render_s, write_s, size, slot_sizes):
+        if not self.enabled: return
+        self.pages.append({
+            "path": os.path.relpath(out_path, OUTPUT_DIR),
+            "bytes": size,
+            "render_ms": round(render_s * 1000, 3),
+            "write_ms": round(write_s * 1000, 3),
+            "placeholders": dict(sorted((slot_sizes or {}).items(), key=lambda x: (-x[1], x[0])))
+        })
+
+    def report(self, path, top=5):
+        totals = {}
+        for page in self.pages:
+            for slot, size in page['placeholders'].items():
+                totals[slot] = totals.get(slot, 0) + size
+        data = {
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "stages": {name: round(sec * 1000, 3) for name, sec in self.stages},
+            "total_bytes": sum(p['bytes'] for p in self.pages),
+            "pages": sorted(self.pages, key=lambda p: (-p['bytes'], p['path'])),
+            "placeholders": dict(sorted(totals.items(), key=lambda x: (-x[1], x[0])))
+        }
+
+        print("--- ⏱️  Build Profile ---")
+        for name, ms in data['stages'].items():
+            print(f"   {name:<28} {ms:>10.2f} ms")
+        print(f"   {'total':<28} {data['total_ms']:>10.2f} ms")
+        print(f"📦 Pages ({len(self.pages)}, {data['total_bytes']:,} bytes):")
+        for page in data['pages']:
+            print(f"   {page['path']:<40} {page['bytes']:>10,} B  render {page['render_ms']:.2f} ms  write {page['write_ms']:.2f} ms")
+            slots = ', '.join(f"{{{{{k}}}}} {v:,} B" for k, v in list(page['placeholders'].items())[:top])
+            if slots: print(f"      {slots}")
+        print("🧩 Placeholder bytes (all pages):")
+        for slot, size in list(data['placeholders'].items())[:top * 3]:
+            print(f"   {{{{{slot}}}}}".ljust(32) + f"{size:>12,} B")
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        print(f"   -> Report: {path}")
+
+# --- PARALLEL RENDERING (--jobs N) ---
+# Each worker gets the parent's resolved site slots (the map assets are
+# published once, by the parent) and compiles the templates once, then renders
+# and writes many pages. Only small result records travel back to the parent.
+_WORKER = {}
+
+def _init_render_worker(config, resolved, templates, options):
+    _WORKER['build'] = BuildContext(config, precompress=options['precompress'], resolved=resolved)
+    _WORKER['templates'] = {name: compile_template(source, name) for name, source in templates.items()}
+    _WORKER['options'] = options
+
+def _render_one(template, build, job, options):
+    _, page_data, variant, extra, out_path = job
+    start = time.perf_counter()
+    slot_sizes = {} if options['profile'] else None
+    html = render_page(template, build, page_data, variant=variant, extra=extra, slot_sizes=slot_sizes)
+    if options['minify']: html = minify_html(html)
+    rendered = time.perf_counter()
+
+    data = html.encode('utf-8')
+    written = write_if_changed(out_path, data)
+    if options['precompress'] and (written or not all(os.path.exists(p) for p in compressed_siblings(out_path))):
+        write_precompressed(out_path, data)
+    elif written:
+        remove_precompressed(out_path)
+    return {
+        'written': written, 'digest': hashlib.sha256(data).hexdigest(), 'bytes': len(data),
+        'render_s': rendered - start, 'write_s': time.perf_counter() - rendered, 'slot_sizes': slot_sizes
+    }
+
+def _render_job(job):
+    return _render_one(_WORKER['templates'][job[0]], _WORKER['build'], job, _WORKER['options'])
+
+def render_jobs(build, jobs, workers=1, **options):
+    """
+    Render and write (template, page_data, variant, extra, out_path) jobs,
+    serially or across a process pool, and yield one result record per job in
+    job order. Order never depends on scheduling.
+    options: minify, precompress, profile.
+    """
+    if workers <= 1 or len(jobs) < 2:
+        for job in jobs:
+            yield _render_one(job[0], build, job, options)
+        return
+    templates = {job[0].name: job[0].source for job in jobs}
+    payload = [(job[0].name,) + tuple(job[1:]) for job in jobs]
+    chunksize = max(1, len(payload) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                             initargs=(build.config, build.resolved(), templates, options)) as pool:
+        yield from pool.map(_render_job, payload, chunksize=chunksize)
 
 # ==========================================
 # 4. MAIN BUILD PROCESS
 # ==========================================
-def build_site():
+def build_site(force=False, jobs=1, minify=False, precompress=False, profile_path=None):
     print("--- 🔨 Starting Build Process ---")
+    # A profile measures every page, so it always renders the full site
+    profile = BuildProfile(enabled=bool(profile_path))
+    if profile.enabled: force = True
+
     config = load_json(CONFIG_PATH)
     if not config: 
         print("❌ Config not found!")
         return
+    profile.mark('config load')
 
     try:
         with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f: master_template_content = f.read()
@@ -613,15 +1054,33 @@ def build_site():
         print("❌ Template file not found")
         return
 
-    print("📄 Building Pages...")
-    
-    # Get Theme Contexts
-    theme_page_conf = config.get('theme_page', {}) # Get Static Context
-    if not theme_page_conf: theme_page_conf = config.get('theme', {})
+    # Compile each template once; every page then renders in a single pass
+    master_template = compile_template(master_template_content, TEMPLATE_PATH)
+    watch_template = compile_template(watch_template_content, WATCH_TEMPLATE_PATH)
+    page_template = compile_template(page_template_content, PAGE_TEMPLATE_PATH)
+    profile.mark('template load')
+
+    # Theme variants, site slots and JSON maps are resolved once for the whole build
+    build = BuildContext(config, precompress=precompress)
+    # Publishes (and prunes) the fingerprinted map files even when every page is up to date
+    build.site_slots()
+    profile.mark('site context + map assets')
 
-    # NEW: Load Watch Theme Config
-    theme_watch_conf = config.get('theme_watch', {})
-    if not theme_watch_conf: theme_watch_conf = config.get('theme', {})
+    # Incremental build: only pages whose inputs changed are rendered
+    manifest = BuildManifest(os.path.join(OUTPUT_DIR, BUILD_MANIFEST_PATH), force=force)
+    stats = {'rendered': 0, 'fresh': 0, 'written': 0}
+    # Outputs in build order: [out_path, input key, render job or None if fresh, log line]
+    outputs = []
+
+    def emit(template, page_data, variant, extra, out_path, log=None):
+        key = input_digest(build.input_digest(variant), template.digest, page_data, extra, minify)
+        fresh = manifest.is_fresh(out_path, key)
+        if fresh and precompress:
+            fresh = all(os.path.exists(p) for p in compressed_siblings(out_path))
+        job = None if fresh else (template, page_data, variant, extra, out_path)
+        outputs.append([out_path, key, job, log])
+
+    print("📄 Building Pages...")
 
     for page in config.get('pages', []):
         slug = page.get('slug')
@@ -629,43 +1088,42 @@ def build_site():
         
         layout = page.get('layout')
         
-        final_template = master_template_content
-        active_theme_override = None
+        final_template = master_template
+        active_variant = 'theme'
+        page_extra = None
 
         # ... inside the loop ...
         if layout == 'watch':
-            final_template = watch_template_content
-            active_theme_override = theme_watch_conf 
+            final_template = watch_template
+            active_variant = 'theme_watch'
             
             # INJECT WATCH CONFIG
             w_conf = config.get('watch_settings', {})
-            final_template = final_template.replace('{{SUPABASE_URL}}', w_conf.get('supabase_url', ''))
-            final_template = final_template.replace('{{SUPABASE_KEY}}', w_conf.get('supabase_key', ''))
-            final_template = final_template.replace('{{WATCH_ARTICLE}}', w_conf.get('article', ''))
-            final_template = final_template.replace('{{WATCH_AD_MOBILE}}', w_conf.get('ad_mobile', ''))
-            final_template = final_template.replace('{{WATCH_AD_SIDEBAR_1}}', w_conf.get('ad_sidebar_1', ''))
-            final_template = final_template.replace('{{WATCH_AD_SIDEBAR_2}}', w_conf.get('ad_sidebar_2', ''))
-            
-            # NEW: Inject SEO Templates into JS Variables
-            # We use distinct placeholders so we don't conflict with standard META tags
-            final_template = final_template.replace('{{JS_WATCH_TITLE_TPL}}', w_conf.get('meta_title', 'Watch {{HOME}} vs {{AWAY}} Live'))
-            final_template = final_template.replace('{{JS_WATCH_DESC_TPL}}', w_conf.get('meta_desc', 'Watch {{HOME}} vs {{AWAY}} live stream online.'))
+            page_extra = {
+                'SUPABASE_URL': w_conf.get('supabase_url', ''),
+                'SUPABASE_KEY': w_conf.get('supabase_key', ''),
+                'WATCH_ARTICLE': w_conf.get('article', ''),
+                'WATCH_AD_MOBILE': w_conf.get('ad_mobile', ''),
+                'WATCH_AD_SIDEBAR_1': w_conf.get('ad_sidebar_1', ''),
+                'WATCH_AD_SIDEBAR_2': w_conf.get('ad_sidebar_2', ''),
+                # NEW: Inject SEO Templates into JS Variables
+                # We use distinct placeholders so we don't conflict with standard META tags
+                'JS_WATCH_TITLE_TPL': w_conf.get('meta_title', 'Watch {{HOME}} vs {{AWAY}} Live'),
+                'JS_WATCH_DESC_TPL': w_conf.get('meta_desc', 'Watch {{HOME}} vs {{AWAY}} live stream online.'),
+            }
 
             # Fallback for the static page load (before JS runs)
             page['meta_title'] = "Watch Live Sports"
             page['meta_desc'] = "Live sports streaming coverage."
         # ... rest of loop
         elif layout == 'page':
-            final_template = page_template_content
-            active_theme_override = theme_page_conf # Apply Static Context
-        
-        # Render
-        final_html = render_page(final_template, config, page, theme_override=active_theme_override)
+            final_template = page_template
+            active_variant = 'theme_page' # Apply Static Context
         
+        # Render (skipped when the manifest says the inputs are unchanged)
         out_dir = os.path.join(OUTPUT_DIR, slug) if slug != 'home' else OUTPUT_DIR
-        os.makedirs(out_dir, exist_ok=True)
-        with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
-            f.write(final_html)
+        emit(final_template, page, active_variant, page_extra, os.path.join(out_dir, 'index.html'))
+    profile.mark('pages: prepare + hash')
     
     # ==========================================
     # 5. BUILD LEAGUE PAGES
@@ -678,14 +1136,11 @@ def build_site():
             league_template_content = f.read()
     
     if league_template_content:
+        league_template = compile_template(league_template_content, LEAGUE_TEMPLATE_PATH)
         target_country = config.get('site_settings', {}).get('target_country', 'US')
         priorities = config.get('sport_priorities', {}).get(target_country, {})
         articles = config.get('articles', {})
         
-        # Get League Theme or fallback
-        theme_league = config.get('theme_league', {})
-        if not theme_league: theme_league = config.get('theme', {})
-
         domain = config.get('site_settings', {}).get('domain', 'example.com')
 
         # Templates from Admin
@@ -745,25 +1200,64 @@ def build_site():
                 'schemas': {'org': True, 'website': True}
             }
 
-            # 4. Render
-            html = render_page(league_template_content, config, page_data, theme_override=theme_league)
-            
-            # 5. Injections (Fixes Placeholder Issue)
-            html = html.replace('{{PAGE_FILTER}}', name)
-            html = html.replace('{{LEAGUE_ARTICLE}}', final_art)
-            html = html.replace('{{TEXT_LIVE_SECTION_TITLE}}', sec_live) # Inject Processed Title
-            html = html.replace('{{TEXT_UPCOMING_TITLE}}', sec_upc)      # Inject Processed Title
-            html = html.replace('{{HERO_PILLS}}', build_menu_html(config.get('menus', {}).get('hero', []), 'hero'))
-            
-            # 6. Write File
+            # 4. Injections (Fixes Placeholder Issue)
+            # NOTE: render_page already owns TEXT_LIVE_SECTION_TITLE and HERO_PILLS,
+            # so those two keep the theme values exactly as the old chained replace did.
+            league_extra = {
+                'PAGE_FILTER': name,
+                'LEAGUE_ARTICLE': final_art,
+                'TEXT_LIVE_SECTION_TITLE': sec_live, # Inject Processed Title
+                'TEXT_UPCOMING_TITLE': sec_upc,      # Inject Processed Title
+                'HERO_PILLS': build.site_slots()['HERO_PILLS'],
+            }
+            league_extra['LEAGUE_SNAPSHOT_URL'] = f"/{SCHEDULE_DIR}/{normalize_key(name)}.json"
+            # Logo map: shared core + this league's shard only
+            map_urls = build.image_map_urls(name)
+            league_extra['JS_IMAGE_MAP_URLS'] = json.dumps(map_urls)
+            league_extra['IMAGE_MAP_PRELOAD'] = '\n    '.join(f'<link rel="preload" href="{u}" as="fetch" crossorigin="anonymous">' for u in map_urls)
+
+            # 5. Queue Render (unchanged inputs are skipped)
             out_dir = os.path.join(OUTPUT_DIR, slug)
-            os.makedirs(out_dir, exist_ok=True)
-            with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
-                f.write(html)
-            
-            print(f"   -> Built: {slug} (Filter: {name})")
+            emit(league_template, page_data, 'theme_league', league_extra, os.path.join(out_dir, 'index.html'), log=f"{slug} (Filter: {name})")
+
+    # Every page now holds its map URLs: drop map files no page of this build references
+    pruned = prune_json_assets('image_map', build.published)
+    if pruned: print(f"   -> Removed {pruned} unreferenced image map files")
+
+    # ==========================================
+    # 6. RENDER & WRITE (serial or --jobs N; written and logged in build order)
+    # ==========================================
+    profile.mark('league pages: prepare + hash')
+    results = render_jobs(build, [job for _, _, job, _ in outputs if job], workers=jobs,
+                          minify=minify, precompress=precompress, profile=profile.enabled)
+    for out_path, key, job, log in outputs:
+        if job is None:
+            stats['fresh'] += 1
+            if log: print(f"   -> Up to date: {log}")
+            continue
+        result = next(results)
+        stats['rendered'] += 1
+        if result['written']: stats['written'] += 1
+        profile.add_page(out_path, result['render_s'], result['write_s'], result['bytes'], result['slot_sizes'])
+        manifest.record(out_path, key, result['digest'])
+        if log: print(f"   -> Built: {log}")
+    profile.mark('render + write')
 
-    print("✅ Build Complete.")
+    manifest.save()
+    profile.mark('manifest save')
+    print(f"✅ Build Complete. ({stats['rendered']} rendered, {stats['fresh']} up to date, {stats['written']} written)")
+    if profile.enabled: profile.report(profile_path)
+    return profile
 
 if __name__ == "__main__":
-    build_site()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the static site from data/config.json")
+    parser.add_argument('--force', action='store_true', help="ignore the build manifest and re-render every page")
+    parser.add_argument('--jobs', type=int, default=1, help="render pages in N worker processes (0 = one per CPU)")
+    parser.add_argument('--minify', action='store_true', help="minify the generated HTML, inline CSS and inline JS")
+    parser.add_argument('--precompress', action='store_true', help="write .gz (and .br, if brotli is installed) next to every output")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_REPORT_PATH, metavar='JSON',
+                        help=f"time every stage and page, break down bytes per placeholder (report: {PROFILE_REPORT_PATH}); implies --force")
+    args = parser.parse_args()
+    build_site(force=args.force, jobs=args.jobs if args.jobs > 0 else (os.cpu_count() or 1),
+               minify=args.minify, precompress=args.precompress, profile_path=args.profile)
@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+from io import BytesIO
+
+from PIL import Image
+
+from asset_manifest import AssetManifest
+from generate_map import LEAGUE_MAP_FILE, index_team_logos, shard_key
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# Packs each league's team logos (groupings from league_map.json) into one
+# sprite sheet, so a league page downloads one cached image per league
+# instead of one request per logo. generate_map.py publishes the coordinates
+# in the per-league shards only; other pages (and other logos) use <img>.
+#
+# A league is only packed again when its inputs changed (logo URLs, logo file
+# contents, sheet layout and WEBP options, digested into sheets[key]["inputs"]).
+# Replaced sheets are removed once no map file in assets/data references them:
+# pages published by an earlier build_site run keep loading their sheets.
+SPRITE_DIR = 'assets/logos/sprites'
+SPRITE_INDEX_FILE = 'assets/data/sprite_index.json'
+LOGO_PX = 60          # Logos are stored at 60x60 (see transcode.py)
+CELL_PX = 64          # Multiple of 16 (WEBP macroblock): no lossy bleed between cells
+PAD_PX = (CELL_PX - LOGO_PX) // 2
+WEBP_OPTIONS = {'quality': 90, 'method': 6}
+MAP_FILES = 'assets/data/image_map*.json'   # Map files (source and published) that may reference sheets
+
+# ==========================================
+# 2. HELPER FUNCTIONS
+# ==========================================
+def pack_sheet(logo_urls):
+    """
+    Grid-packs the logos (URL paths like /assets/logos/tsdb/x.webp) into one
+    image. Returns (webp bytes, (width, height), {logo_url: [x, y]}) where
+    x, y is the top-left corner of the 60x60 logo inside the sheet.
+    """
+    cols = math.ceil(math.sqrt(len(logo_urls)))
+    rows = math.ceil(len(logo_urls) / cols)
+    sheet = Image.new('RGBA', (cols * CELL_PX, rows * CELL_PX), (0, 0, 0, 0))
+    positions = {}
+    for i, url in enumerate(logo_urls):
+        x = (i % cols) * CELL_PX + PAD_PX
+        y = (i // cols) * CELL_PX + PAD_PX
+        with Image.open(url.lstrip('/')) as logo:
+            logo = logo.convert('RGBA')
+            if logo.size != (LOGO_PX, LOGO_PX):
+                logo = logo.resize((LOGO_PX, LOGO_PX), Image.Resampling.LANCZOS)
+            sheet.paste(logo, (x, y))
+        positions[url] = [x, y]
+
+    buffer = BytesIO()
+    sheet.save(buffer, "WEBP", **WEBP_OPTIONS)
+    return buffer.getvalue(), sheet.size, positions
+
+def sheet_inputs(logo_urls):
+    """Digest of everything a league's sheet is packed from."""
+    h = hashlib.sha256(json.dumps([CELL_PX, LOGO_PX, WEBP_OPTIONS, logo_urls], sort_keys=True).encode('utf-8'))
+    for url in logo_urls:
+        with open(url.lstrip('/'), 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+def referenced_sheets():
+    """Names of the sheets the map files in assets/data still point at."""
+    pattern = re.compile(rf'/{re.escape(SPRITE_DIR)}/([^"/]+\.webp)')
+    names = set()
+    for path in glob.glob(MAP_FILES):
+        with open(path, 'r', encoding='utf-8') as f:
+            names.update(pattern.findall(f.read()))
+    return names
+
+def write_sheet(key, data):
+    """Writes a content-hashed sheet (cacheable forever). Returns its URL."""
+    name = f"{key}.{hashlib.sha256(data).hexdigest()[:10]}.webp"
+    path = os.path.join(SPRITE_DIR, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return f"/{SPRITE_DIR}/{name}"
+
+# ==========================================
+# 3. MAIN EXECUTION
+# ==========================================
+def main(team_logos=None):
+    """Standalone, or as a pipeline.py stage with the shared logo index."""
+    print("--- Building League Sprite Sheets ---")
+    if not os.path.exists(LEAGUE_MAP_FILE):
+        print(f"   [!] {LEAGUE_MAP_FILE} not found")
+        return
+    with open(LEAGUE_MAP_FILE, 'r', encoding='utf-8') as f:
+        league_map = json.load(f)
+    slug_to_path = team_logos if team_logos is not None else index_team_logos(AssetManifest().aliases())
+
+    previous = {}
+    if os.path.exists(SPRITE_INDEX_FILE):
+        with open(SPRITE_INDEX_FILE, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    os.makedirs(SPRITE_DIR, exist_ok=True)
+    sheets, logos = {}, {}
+    reused = 0
+    for league, slugs in sorted(league_map.items()):
+        key = shard_key(league)
+        if not key or key == 'null': continue
+        # Unique logo files of the league (aliases share one file, so one cell)
+        urls = sorted({slug_to_path[s] for s in slugs if s in slug_to_path})
+        if len(urls) < 2: continue  # A one-logo sheet saves nothing
+        inputs = sheet_inputs(urls)
+        old = previous.get('sheets', {}).get(key)
+        if old and old.get('inputs') == inputs and key in previous.get('logos', {}) \
+                and os.path.exists(old['url'].lstrip('/')):
+            sheets[key], logos[key] = old, previous['logos'][key]
+            reused += 1
+            continue
+        data, size, positions = pack_sheet(urls)
+        sheets[key] = {"url": write_sheet(key, data), "size": list(size), "inputs": inputs}
+        logos[key] = positions
+        print(f" > {league}: {len(urls)} logos, {size[0]}x{size[1]}, {len(data) / 1024:.1f} KB")
+
+    # Sheets of previous runs, once no map file references them any more
+    keep = {os.path.basename(s['url']) for s in sheets.values()} | referenced_sheets()
+    for f in os.listdir(SPRITE_DIR):
+        if f not in keep:
+            os.remove(os.path.join(SPRITE_DIR, f))
+
+    with open(SPRITE_INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"cell": CELL_PX, "logo": LOGO_PX, "sheets": sheets, "logos": logos}, f, indent=1, sort_keys=True)
+    print(f"--- Sprites Saved: {len(sheets)} Sheets ({reused} unchanged), {sum(len(p) for p in logos.values())} Logos ---")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
-import requests
-import re
-import time
-from PIL import Image
-from io import BytesIO
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import http_client
+from asset_manifest import AssetManifest
+from backend_snapshot import SnapshotStore, match_key
+from normalize import normalize_matches
+from transcode import TRANSCODE_WORKERS, transcode_logo, transcode_pool
 
 # ==========================================
 # 1. CONFIGURATION
@@ -15,74 +19,31 @@ STREAMED_HASH_BASE = "https://streamed.pk/api/images/badge/"
 TSDB_DIR = "assets/logos/tsdb"
 STREAMED_DIR = "assets/logos/streamed"
 LEAGUE_DIR = "assets/logos/leagues"
+DEDUPE_ORDER = [TSDB_DIR, LEAGUE_DIR, STREAMED_DIR]  # Which copy of a duplicate image is kept
+
+# SNAPSHOT DELTA (only new/changed matches are processed between full passes)
+CONSUMER = 'fetch_streamed'
+IMAGE_FIELDS = ['home_team', 'away_team', 'league', 'home_team_image', 'away_team_image', 'league_image']
 
-# REFRESH SETTINGS
-REFRESH_DAYS = 60
+# CONCURRENCY SETTINGS
+MAX_WORKERS = 16      # Global cap: downloads in flight at once
+PER_HOST_LIMIT = 4    # Cap per host (streamed.pk, CDNs) so we never hammer one origin
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-# --- WHITELIST FOR CLEANING ONLY ---
-ALLOWED_LEAGUES_INPUT = """
-NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball, 
-NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League, 
-Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American-Football, American Football, 
-Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership, 
-Europa League, Europa-League, A League, A-League, A League Men, A League Women, 
-Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
-"""
-VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
-
 # ==========================================
 # 2. UTILS
 # ==========================================
-def slugify(name):
-    if not name: return None
-    clean = str(name).lower()
-    clean = re.sub(r"[^\w\s-]", "", clean)
-    clean = re.sub(r"\s+", "-", clean)
-    return clean.strip("-")
-
-def clean_display_name(name):
-    """
-    Sanitizer: Priority Colon Rule -> Whitelist Fallback
-    """
-    if not name: return None
-    
-    # Rule 1: Colon
-    if ':' in name:
-        parts = name.split(':', 1)
-        if len(parts) > 1:
-            cleaned = parts[1].strip()
-            if cleaned and len(cleaned) > 1:
-                return cleaned
-
-    # Rule 2: Whitelist
-    lower_name = name.lower()
-    for league in VALID_LEAGUES:
-        if lower_name.startswith(league):
-            remainder = name[len(league):]
-            clean_remainder = re.sub(r"^[\s-]+", "", remainder)
-            if clean_remainder and len(clean_remainder.strip()) > 1:
-                return clean_remainder.strip()
-                
-    return name.strip()
-
 def resolve_url(source_val):
     if not source_val: return None
     if source_val.startswith("http"):
         return source_val
     return f"{STREAMED_HASH_BASE}{source_val}.webp"
 
-def should_download(path):
-    if not os.path.exists(path): return True
-    file_age_days = (time.time() - os.path.getmtime(path)) / (24 * 3600)
-    return file_age_days > REFRESH_DAYS
-
-def download_multi_source(source_obj, save_path):
-    if not should_download(save_path): return False
-    
+def source_urls(source_obj):
+    """Candidate image URLs of a backend image field (dict, list or single value), in order."""
     urls = []
     if isinstance(source_obj, dict):
         urls = list(source_obj.values())
@@ -90,78 +51,138 @@ def download_multi_source(source_obj, save_path):
         urls = source_obj
     elif isinstance(source_obj, str):
         urls = [source_obj]
+    return [u for u in (resolve_url(raw) for raw in urls) if u]
 
-    for raw_url in urls:
-        final_url = resolve_url(raw_url)
-        if not final_url: continue
+_host_slots = {}
+_host_slots_lock = threading.Lock()
 
+def host_slot(url):
+    """Semaphore limiting concurrent requests to the URL's host."""
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_slots[host]
+
+def download_multi_source(manifest, transcoder, urls, save_path):
+    """
+    Try each candidate URL in order (conditional GET via the manifest); the
+    first one that answers settles it. Encoding runs in the transcoder process
+    pool while this thread waits, so other downloads keep going meanwhile.
+    True if a new image was written, False if the logo is unchanged, None if
+    no URL answered. Thread-safe.
+    """
+    errors = []
+    for final_url in urls:
         try:
-            resp = requests.get(final_url, headers=HEADERS, timeout=8)
-            if resp.status_code == 200:
-                img = Image.open(BytesIO(resp.content))
-                if img.mode != 'RGBA': img = img.convert('RGBA')
-                img = img.resize((60, 60), Image.Resampling.LANCZOS)
-                
-                temp_buffer = BytesIO()
-                img.save(temp_buffer, "WEBP", quality=90, method=6)
-                
-                with open(save_path, "wb") as f:
-                    f.write(temp_buffer.getvalue())
-                return True
-        except:
-            continue
-    return False
+            with host_slot(final_url):
+                content = manifest.fetch(save_path, final_url, HEADERS)
+            if content is None: return False  # Upstream unchanged (304 / same bytes)
+            output = transcoder.submit(transcode_logo, content).result()
+            return manifest.record(save_path, output)
+        except Exception as e:
+            errors.append(f"{final_url}: {e}")
+    if errors:
+        print(f"   [!] {save_path}: no source answered ({'; '.join(errors)})")
+    return None
 
 # ==========================================
 # 3. MAIN EXECUTION
 # ==========================================
-def main():
+def main(manifest=None, snapshot=None, transcoder=None):
+    """Standalone, or as a pipeline.py stage with the shared manifest, snapshot and transcoder pool."""
     os.makedirs(STREAMED_DIR, exist_ok=True)
     os.makedirs(LEAGUE_DIR, exist_ok=True)
     
     print("--- Starting Backend Asset Sync (All Teams) ---")
     
+    # Matches are streamed: from the stored snapshot, or parsed as the backend response arrives
+    store = SnapshotStore()
+    matches = snapshot or store.stream(BACKEND_URL, HEADERS)
+    manifest = manifest or AssetManifest()
+
+    # Delta since the last processed snapshot (+ matches whose downloads failed last time)
+    delta = store.delta(CONSUMER, fields=IMAGE_FIELDS)
+    retry = set(store.state(CONSUMER).get('retry', []))
+
+    # 1. Queue Downloads (one job per output file, started as soon as it is known;
+    #    repeated teams only add fallback URLs, tried afterwards if the first ones all failed)
+    queue = {}  # save_path -> {"kind", "urls", "tried", "matches", "future"}
+
+    def enqueue(kind, save_path, source_obj, m):
+        job = queue.get(save_path)
+        if job is None:
+            if not manifest.is_due(save_path): return
+            job = queue[save_path] = {"kind": kind, "urls": [], "tried": 0, "matches": set(), "future": None}
+        job['matches'].add(match_key(m))
+        for url in source_urls(source_obj):
+            if url not in job['urls']: job['urls'].append(url)
+        if job['future'] is None and job['urls']:
+            submit(save_path, job)
+
+    def submit(save_path, job):
+        urls = job['urls'][job['tried']:]
+        job['tried'] = len(job['urls'])
+        job['future'] = pool.submit(download_multi_source, manifest, transcoder, urls, save_path)
+
+    processed = 0
+    # 2. Download Concurrently (global cap via the pool, per-host cap inside download_multi_source),
+    #    transcoding in a separate process pool, while the matches are still being read
     try:
-        data = requests.get(BACKEND_URL, headers=HEADERS).json()
-        matches = data.get('matches', [])
-    except Exception as e:
+        with transcode_pool(transcoder) as transcoder, ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            for m, names in normalize_matches(matches):
+                kind = delta.add(m)
+                if not delta.full and kind is None and match_key(m) not in retry: continue
+                processed += 1
+
+                # PROCESS TEAMS
+                for side in ('home_team', 'away_team'):
+                    clean_name, slug = names[side]
+                    img_obj = m.get(f'{side}_image')
+                    if not slug: continue
+
+                    # Check TSDB first
+                    tsdb_path = os.path.join(TSDB_DIR, f"{slug}.webp")
+                    if not manifest.exists(tsdb_path):
+                        streamed_path = os.path.join(STREAMED_DIR, f"{slug}.webp")
+                        if img_obj: enqueue('team', streamed_path, img_obj, m)
+
+                # PROCESS LEAGUE IMAGE
+                league_imgs = m.get('league_image')
+                if names['league'] and league_imgs:
+                    l_path = os.path.join(LEAGUE_DIR, f"{names['league']}.webp")
+                    enqueue('league', l_path, league_imgs, m)
+
+            # Fallback URLs that arrived after a job's first attempt had started
+            for save_path, job in queue.items():
+                if job['tried'] < len(job['urls']) and job['future'].result() is None:
+                    submit(save_path, job)
+            results = {path: job['future'].result() for path, job in queue.items() if job['future']}
+    except (OSError, ValueError) as e:  # Network / parse errors of the backend stream
         print(f"CRITICAL: Backend unavailable - {e}")
         return
-
-    team_count = 0
-    league_count = 0
-
-    for m in matches:
-        home_raw = m.get('home_team')
-        away_raw = m.get('away_team')
-        league_raw = m.get('league') 
-        
-        home_imgs = m.get('home_team_image')
-        away_imgs = m.get('away_team_image')
-        league_imgs = m.get('league_image')
-
-        # PROCESS TEAMS
-        for raw_name, img_obj in [(home_raw, home_imgs), (away_raw, away_imgs)]:
-            name = clean_display_name(raw_name)
-            slug = slugify(name)
-            if not slug: continue
-
-            # Check TSDB first
-            tsdb_path = os.path.join(TSDB_DIR, f"{slug}.webp")
-            if not os.path.exists(tsdb_path):
-                streamed_path = os.path.join(STREAMED_DIR, f"{slug}.webp")
-                if img_obj and download_multi_source(img_obj, streamed_path):
-                    team_count += 1
-
-        # PROCESS LEAGUE IMAGE
-        if league_raw and league_imgs:
-            l_slug = slugify(league_raw)
-            if l_slug:
-                l_path = os.path.join(LEAGUE_DIR, f"{l_slug}.webp")
-                if download_multi_source(league_imgs, l_path):
-                    league_count += 1
-
+    snapshot = snapshot or matches.snapshot
+
+    if delta.full:
+        print(f" > Snapshot {snapshot.version}: full pass over {processed} matches")
+    else:
+        print(f" > Snapshot {snapshot.version}: {len(delta.new)} new, {len(delta.changed)} changed, "
+              f"{len(delta.removed)} removed matches ({len(delta.names('teams')['new'])} new teams)")
+    print(f" > {len(results)} logos fetched ({processed} matches, {MAX_WORKERS} workers, {PER_HOST_LIMIT}/host, {TRANSCODE_WORKERS} encoders)")
+
+    # 3. Store Each Unique Image Once (duplicates become aliases in the manifest)
+    removed, saved = manifest.dedupe(DEDUPE_ORDER)
+    if removed: print(f" > Deduplicated {removed} logos ({saved / 1024:.1f} KB)")
+    manifest.save()
+
+    # Matches whose logo is still missing are picked up again by the next delta
+    retry = sorted({k for path, job in queue.items() if job['urls'] and not manifest.exists(path) for k in job['matches']})
+    store.commit(CONSUMER, snapshot, delta.full, retry=retry)
+
+    team_count = sum(1 for path, ok in results.items() if ok and queue[path]['kind'] == 'team')
+    league_count = sum(1 for path, ok in results.items() if ok and queue[path]['kind'] == 'league')
     print(f"--- Sync Done. Teams: {team_count} | Leagues: {league_count} ---")
 
 if __name__ == "__main__":
     main()
+    http_client.print_stats()
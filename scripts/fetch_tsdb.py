@@ -1,10 +1,14 @@
+import hashlib
+import json
 import os
-import requests
 import urllib.parse
-import re
 import time
-from PIL import Image
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+from asset_manifest import AssetManifest
+from normalize import VALID_LEAGUES, slugify
+from transcode import transcode_logo, transcode_pool
 
 # ==========================================
 # 1. CONFIGURATION
@@ -12,24 +16,20 @@ from io import BytesIO
 API_KEY = "123" # Replace with valid key
 BASE_URL = f"https://www.thesportsdb.com/api/v1/json/{API_KEY}"
 SAVE_DIR = "assets/logos/tsdb"
-REFRESH_DAYS = 60
+
+# API LIMITS & CACHE
+RATE_PER_MINUTE = 30      # TSDB free-tier API limit
+LEAGUE_WORKERS = 4        # League queries (and their badge refreshes) in flight at once
+API_LIMITER = http_client.TokenBucket(RATE_PER_MINUTE / 60, burst=LEAGUE_WORKERS)
+CACHE_DIR = ".cache/tsdb" # League responses keyed by query (restored between CI runs)
+CACHE_TTL_HOURS = 12      # Re-query a league at most this often
+REPROCESS_DAYS = 7        # Sweep an unchanged league's badges at least this often
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
 }
 
-# --- WHITELIST CONFIGURATION ---
-ALLOWED_LEAGUES_INPUT = """
-NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball, 
-NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League, 
-Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American Football, 
-Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership, 
-Europa League, Europa-League, A League, A-League, A League Men, A League Women, 
-Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
-"""
-VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
-
 # Map Display Name -> TSDB Search Query
 LEAGUES = {
     "Premier League": "English Premier League",
@@ -59,83 +59,133 @@ LEAGUES = {
 # ==========================================
 # 2. UTILS
 # ==========================================
-def slugify(name):
-    if not name: return None
-    clean = str(name).lower()
-    clean = re.sub(r"[^\w\s-]", "", clean)
-    clean = re.sub(r"\s+", "-", clean)
-    return clean.strip("-")
-
-def should_download(path):
-    if not os.path.exists(path): return True
-    file_age_days = (time.time() - os.path.getmtime(path)) / (24 * 3600)
-    return file_age_days > REFRESH_DAYS
-
-def save_image_optimized(url, save_path):
+def cache_path(query):
+    return os.path.join(CACHE_DIR, f"{hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]}.json")
+
+def load_cache(query):
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        if resp.status_code == 200:
-            img = Image.open(BytesIO(resp.content))
-            if img.mode != 'RGBA': img = img.convert('RGBA')
-            img = img.resize((60, 60), Image.Resampling.LANCZOS)
-            
-            temp_buffer = BytesIO()
-            img.save(temp_buffer, "WEBP", quality=90, method=6)
-            
-            with open(save_path, "wb") as f:
-                f.write(temp_buffer.getvalue())
-            return True
-    except: 
-        pass
+        with open(cache_path(query), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fetch_league(query):
+    """
+    search_all_teams.php for one league, through the on-disk response cache.
+    Returns (data, changed): changed is False when the response is the one
+    already processed and that processing is recent (skip the badges).
+    """
+    entry = load_cache(query)
+    now = time.time()
+    if now - entry.get('fetched_at', 0) > CACHE_TTL_HOURS * 3600:
+        url = f"{BASE_URL}/search_all_teams.php?l={urllib.parse.quote(query)}"
+        resp = http_client.get(url, headers=HEADERS, limiter=API_LIMITER)
+        resp.raise_for_status()
+        data = resp.json()
+        entry.update(query=query, fetched_at=now, data=data,
+                     sha=hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest())
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path(query), 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+    # Unchanged leagues are still swept every REPROCESS_DAYS (badge revalidation comes due over time)
+    fresh = now - entry.get('processed_at', 0) < REPROCESS_DAYS * 24 * 3600
+    return entry.get('data'), not (fresh and entry.get('processed_sha') == entry.get('sha'))
+
+def mark_processed(query):
+    entry = load_cache(query)
+    if not entry: return
+    entry.update(processed_sha=entry.get('sha'), processed_at=time.time())
+    with open(cache_path(query), 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+
+def queue_image(manifest, transcoder, url, save_path, failed):
+    """
+    Revalidates one logo. Returns a future for its encode (runs in the
+    transcoder pool while the next download proceeds), or None if there is
+    nothing to encode or the download failed (recorded in `failed`).
+    """
+    try:
+        content = manifest.fetch(save_path, url, HEADERS)
+        if content is not None:  # None: upstream unchanged (304 / same bytes)
+            return transcoder.submit(transcode_logo, content)
+    except Exception as e:
+        failed.append(f"{save_path}: {e}")
+    return None
+
+def save_image_optimized(manifest, future, save_path, failed):
+    """Stores a finished encode. True only if a new image was written (failures go to `failed`)."""
+    try:
+        return manifest.record(save_path, future.result())
+    except Exception as e:
+        failed.append(f"{save_path}: {e}")
     return False
 
 # ==========================================
 # 3. MAIN EXECUTION
 # ==========================================
-def main():
+def sync_league(query, display_names, manifest, transcoder):
+    """Queries one TSDB league and refreshes its badges. Returns the log lines (printed in order by main)."""
+    lines = [f" > Checking: {', '.join(display_names)}"]
+    try:
+        data, changed = fetch_league(query)
+        if not changed:
+            lines.append("   [=] Unchanged since last sync, skipped.")
+            return lines
+
+        failed = []
+        if data and data.get('teams'):
+            encodes = []
+            for t in data['teams']:
+                name = t.get('strTeam')
+                if name:
+                    slug = slugify(name)
+                    if slug:
+                        # Note: NO league_map logic here.
+                        
+                        # Download Image
+                        badge = t.get('strTeamBadge') or t.get('strBadge')
+                        if badge:
+                            path = os.path.join(SAVE_DIR, f"{slug}.webp")
+                            if manifest.is_due(path):
+                                future = queue_image(manifest, transcoder, badge, path, failed)
+                                if future: encodes.append((path, future))
+            
+            count = sum(1 for path, future in encodes if save_image_optimized(manifest, future, path, failed))
+            if count > 0: lines.append(f"   [+] Processed {count} updates.")
+        else:
+            lines.append(f"   [-] No teams found for {query}")
+
+        # A failed badge keeps the league due, so the next run retries it
+        if failed:
+            lines.append(f"   [!] {len(failed)} badges failed, retrying next run:")
+            lines.extend(f"       {line}" for line in failed)
+        else:
+            mark_processed(query)
+
+    except Exception as e:
+        lines.append(f"   [!] Error: {e}")
+    return lines
+
+def main(manifest=None, transcoder=None):
+    """Standalone, or as a pipeline.py stage with the shared manifest and transcoder pool."""
     os.makedirs(SAVE_DIR, exist_ok=True)
     print("--- Starting TSDB Harvester (Image Only) ---")
+    manifest = manifest or AssetManifest()
 
+    # Whitelisted leagues, one query per TSDB league name (display aliases share it)
+    queries = {}
     for display_name, tsdb_name in LEAGUES.items():
-        # Whitelist Check
-        if display_name.lower() not in VALID_LEAGUES:
-            continue
-
-        print(f" > Checking: {display_name}")
-        encoded = urllib.parse.quote(tsdb_name)
-        url = f"{BASE_URL}/search_all_teams.php?l={encoded}"
-        
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=10)
-            data = resp.json()
-            
-            if data and data.get('teams'):
-                count = 0
-                for t in data['teams']:
-                    name = t.get('strTeam')
-                    if name:
-                        slug = slugify(name)
-                        if slug:
-                            # Note: NO league_map logic here.
-                            
-                            # Download Image
-                            badge = t.get('strTeamBadge') or t.get('strBadge')
-                            if badge:
-                                path = os.path.join(SAVE_DIR, f"{slug}.webp")
-                                if should_download(path):
-                                    if save_image_optimized(badge, path):
-                                        count += 1
-                
-                if count > 0: print(f"   [+] Processed {count} updates.")
-            else:
-                print(f"   [-] No teams found for {tsdb_name}")
-
-        except Exception as e:
-            print(f"   [!] Error: {e}")
-        
-        time.sleep(1.2)
+        if display_name.lower() in VALID_LEAGUES:
+            queries.setdefault(tsdb_name, []).append(display_name)
+
+    print(f" > {len(queries)} leagues ({LEAGUE_WORKERS} at a time, {RATE_PER_MINUTE} API calls/min)")
+    with transcode_pool(transcoder) as transcoder, ThreadPoolExecutor(max_workers=LEAGUE_WORKERS) as pool:
+        for lines in pool.map(lambda item: sync_league(item[0], item[1], manifest, transcoder), queries.items()):
+            print("\n".join(lines))
     
+    manifest.save()
     print("--- TSDB Sync Complete ---")
 
 if __name__ == "__main__":
     main()
+    http_client.print_stats()
@@ -0,0 +1,89 @@
+import math
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from difflib import get_close_matches
+from itertools import chain
+
+# ==========================================
+# FUZZY SLUG INDEX
+# ==========================================
+# Same answer as difflib.get_close_matches(word, slugs, n=1, cutoff), without
+# comparing the word against every slug. Slugs are indexed by their bigrams,
+# and difflib itself rescores only the slugs that can possibly reach the
+# cutoff, so scores and tie-breaks are unchanged:
+#
+#   difflib's ratio is 2*M/T (M matched characters, T = both lengths). The M
+#   matched characters form blocks with at least one unmatched character
+#   between them, so there are at most T - 2*M + 1 blocks and the two strings
+#   share at least M - blocks >= 3*M - T - 1 bigrams. A slug sharing fewer
+#   bigrams than that at M = cutoff*T/2 cannot match, and neither can one whose
+#   length alone caps the ratio (2*min/T) below the cutoff.
+#
+# Postings are sorted by slug length, so a query only counts shared bigrams
+# for the slugs inside its length window.
+
+EPSILON = 1e-9    # Bounds are loosened by this much, so float rounding never drops a match
+
+def bigrams(s):
+    """Bigram multiset of s as distinct tokens (a repeated bigram 'ab' becomes 'ab', 'ab1', ...)."""
+    seen = {}
+    tokens = []
+    for i in range(len(s) - 1):
+        gram = s[i:i + 2]
+        count = seen.get(gram, 0)
+        seen[gram] = count + 1
+        tokens.append(gram if count == 0 else f"{gram}{count}")
+    return tokens
+
+class FuzzyIndex:
+    def __init__(self, slugs, cutoff):
+        self.cutoff = cutoff
+        self.slugs = list(dict.fromkeys(slugs))
+        self.lengths = [len(s) for s in self.slugs]
+        self.by_length = defaultdict(list)  # length -> slug ids (short words are scanned by length)
+        postings = defaultdict(list)
+        for i, slug in enumerate(self.slugs):
+            for token in set(bigrams(slug)):
+                postings[token].append(i)
+            self.by_length[self.lengths[i]].append(i)
+        # bigram token -> ([slug lengths], [slug ids]), sorted by length so a
+        # query only reads the ids inside its length window
+        self.postings = {}
+        for token, ids in postings.items():
+            ids.sort(key=self.lengths.__getitem__)
+            self.postings[token] = ([self.lengths[i] for i in ids], ids)
+        self._memo = {}
+
+    def _length_window(self, n):
+        """Slug lengths whose ratio with a length-n word can reach the cutoff."""
+        c = self.cutoff
+        if c <= 0: return 0, math.inf
+        return n * c / (2 - c) - EPSILON, n * (2 - c) / c + EPSILON
+
+    def _min_shared(self, total):
+        """Fewest shared bigrams two strings of combined length `total` need to reach the cutoff."""
+        return 3 * self.cutoff * total / 2 - total - 1 - EPSILON
+
+    def _candidates(self, word):
+        lo, hi = self._length_window(len(word))
+        need = self._min_shared(len(word) + max(0, math.ceil(lo)))
+        if need <= 0:
+            # Too short for the bigram bound: every slug in the length window
+            return [i for n, ids in self.by_length.items() if lo <= n <= hi for i in ids]
+
+        # Shared bigram counts of the slugs in the window (one counting pass, in C)
+        windows = []
+        for token in set(bigrams(word)):
+            if token not in self.postings: continue
+            lengths, ids = self.postings[token]
+            windows.append(ids[bisect_left(lengths, lo):bisect_right(lengths, hi)])
+        shared = Counter(chain.from_iterable(windows))
+        return [i for i, count in shared.items()
+                if count >= need and count >= self._min_shared(len(word) + self.lengths[i])]
+
+    def best(self, word):
+        """get_close_matches(word, slugs, n=1, cutoff)[0], or None."""
+        if word not in self._memo:
+            found = get_close_matches(word, [self.slugs[i] for i in self._candidates(word)], n=1, cutoff=self.cutoff)
+            self._memo[word] = found[0] if found else None
+        return self._memo[word]
@@ -1,8 +1,13 @@
 import os
 import json
-import requests
 import re
-from difflib import get_close_matches
+from asset_manifest import AssetManifest, file_sha, sha256
+from backend_snapshot import SnapshotStore, match_key
+import image_map_codec
+from image_map_codec import decode, encode, map_key
+from logo_index import LogoIndex
+from normalize import VALID_LEAGUES, clean_display_name, slugify
+from resolution_cache import ResolutionCache
 
 # ==========================================
 # 1. CONFIGURATION
@@ -14,52 +19,70 @@ DIRS = {
     'leagues': 'assets/logos/leagues'
 }
 OUTPUT_FILE = 'assets/data/image_map.json'
+SHARDS_FILE = 'assets/data/image_map_shards.json'
+LEAGUE_MAP_FILE = 'assets/data/league_map.json'
+SPRITE_INDEX_FILE = 'assets/data/sprite_index.json'  # Written by build_sprites.py
 FUZZY_CUTOFF = 0.85 
-
-# --- WHITELIST FOR NAME CLEANING ONLY ---
-# We use this ONLY to help clean names like "NBA - Celtics".
-# We DO NOT use this to filter which teams get mapped.
-ALLOWED_LEAGUES_INPUT = """
-NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball, 
-NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League, 
-Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American-Football, American Football, 
-Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership, 
-Europa League, Europa-League, A League, A-League, A League Men, A League Women, 
-Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
-"""
-VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
+CONSUMER = 'generate_map'                            # Snapshot store consumer name
+CODE_FILES = [__file__, image_map_codec.__file__]    # Cached results and outputs are only valid for this code
+MAP_FIELDS = ['home_team', 'away_team', 'league', 'sport']  # Match fields the map depends on
 
 # ==========================================
 # 2. HELPER FUNCTIONS
 # ==========================================
-def clean_display_name(name):
+def load_logo_index(aliases):
+    """The persistent logo directory index (see logo_index.py), brought up to date."""
+    return LogoIndex(DIRS.values()).refresh(aliases)
+
+def index_team_logos(aliases, index=None):
+    """slug -> URL for team logos: TSDB first (priority 1), streamed fills the gaps (priority 2)."""
+    index = index or load_logo_index(aliases)
+    slug_to_path = index.logos(DIRS['tsdb'])
+    for slug, path in index.logos(DIRS['streamed']).items():
+        if slug not in slug_to_path:
+            slug_to_path[slug] = path
+    return slug_to_path
+
+def map_match(m, slug_to_path, resolver, league_paths):
     """
-    Sanitizer:
-    1. PRIORITY RULE: If a colon (:) is found, assume format "League: Team" 
-       and strip everything before the first colon.
-    2. FALLBACK: Check whitelist for prefixes (e.g. "NBA - Team") if no colon exists.
+    Map entries contributed by one backend match:
+    {"teams": {name: path}, "leagues": {name: path}, "members": [[league, team, path, sport]]}.
     """
-    if not name: return None
-    
-    # --- RULE 1: Generic Colon Stripper ---
-    # This ensures "A-League: Team A" becomes "Team A" automatically.
-    if ':' in name:
-        parts = name.split(':', 1)
-        if len(parts) > 1:
-            cleaned = parts[1].strip()
-            if cleaned and len(cleaned) > 1:
-                return cleaned
-
-    # --- RULE 2: Whitelist Fallback ---
-    lower_name = name.lower()
-    for league in VALID_LEAGUES:
-        if lower_name.startswith(league):
-            remainder = name[len(league):]
-            # Remove separator characters (spaces, hyphens) from the start
-            clean_remainder = re.sub(r"^[\s-]+", "", remainder)
-            if clean_remainder and len(clean_remainder.strip()) > 1:
-                return clean_remainder.strip()
-    return name.strip()
+    result = { "teams": {}, "leagues": {}, "members": [] }
+    # We NO LONGER check "if league not in whitelist: continue"
+    # We process ALL matches.
+    league_name = m.get('league')
+
+    # Map Teams
+    for t_key in ['home_team', 'away_team']:
+        raw_name = m.get(t_key)
+        if not raw_name: continue
+        
+        # A. Clean the name (Handles "A-League: Team A" -> "Team A"), B. generate the slug
+        #    from the clean name, C. match it to a file (cached per raw name, see resolution_cache.py)
+        clean_name, slug, matched_slug = resolver.resolve(raw_name)
+        if matched_slug is None: continue
+        
+        if matched_slug == slug:
+            # Perfect Match
+            result['teams'][clean_name] = slug_to_path[slug]
+            result['members'].append([league_name, clean_name, slug_to_path[slug], m.get('sport')])
+            # Also Map "Raw Name" (just in case frontend sends raw name)
+            if raw_name != clean_name:
+                result['teams'][raw_name] = slug_to_path[slug]
+                result['members'].append([league_name, raw_name, slug_to_path[slug], None])
+        else:
+            # Fuzzy Match (indexed; same result as difflib.get_close_matches)
+            result['teams'][clean_name] = slug_to_path[matched_slug]
+            result['members'].append([league_name, clean_name, slug_to_path[matched_slug], m.get('sport')])
+
+    # Map League
+    if league_name:
+        l_slug = slugify(league_name)
+        if l_slug in league_paths:
+            result['leagues'][league_name] = league_paths[l_slug]
+        result['members'].append([league_name, None, None, m.get('sport')])
+    return result
 
 def make_pretty_name(slug):
     """
@@ -68,105 +91,194 @@ def make_pretty_name(slug):
     """
     return slug.replace('-', ' ').title()
 
+def shard_key(name):
+    """
+    Normalizes a league name into a shard key (same rule as build_site).
+    Ex: "Premier League" -> "premierleague"
+    """
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+def sprite_section(sprite_index, keys):
+    """
+    Client-side sprite lookup for the given sheets:
+    {"sheets": {key: [url, w, h]}, "pos": {logo_url: [key, x, y]}}.
+    A logo found in several sheets uses the first one (keys in order).
+    """
+    sheets, pos = {}, {}
+    for key in keys:
+        sheet = sprite_index.get('sheets', {}).get(key)
+        if not sheet: continue
+        sheets[key] = [sheet['url']] + sheet['size']
+        for url, (x, y) in sorted(sprite_index.get('logos', {}).get(key, {}).items()):
+            pos.setdefault(url, [key, x, y])
+    return { "sheets": sheets, "pos": pos }
+
+def add_member(shard_members, league, team, path, sport=None):
+    """Adds a team (or just the league's sport) to the per-league membership that feeds the shards."""
+    key = shard_key(league) if league else ''
+    if not key or key == 'null': return
+    shard = shard_members.setdefault(key, { "name": league, "sports": set(), "teams": {} })
+    if sport: shard['sports'].add(sport.lower())
+    if team: shard['teams'][team] = path
+
+def build_shards(shard_members, final_leagues, sprite_index=None):
+    """
+    Splits the team map per league (each part in the compact format of
+    image_map_codec). Teams that appear under more than one league (cups,
+    cross-league fixtures) are moved into a small shared core so every
+    league page gets them without duplicating them in each shard.
+    """
+    seen = {}
+    for key, shard in shard_members.items():
+        for team in {map_key(t) for t in shard['teams']}:
+            seen[team] = seen.get(team, 0) + 1
+
+    core = {}
+    shards = {}
+    for key, shard in sorted(shard_members.items()):
+        teams = {}
+        for team, path in shard['teams'].items():
+            if seen[map_key(team)] > 1: core[team] = path
+            else: teams[team] = path
+        leagues = {n: p for n, p in final_leagues.items() if shard_key(n) == key}
+        sprites = None
+        if sprite_index and key in sprite_index.get('sheets', {}):
+            sprites = sprite_section(sprite_index, [key])
+        shards[key] = { "name": shard['name'], "sports": sorted(shard['sports']), **encode(teams, leagues, sprites) }
+    return { "core": encode(core, {}), "shards": shards }
+
+def write_map(slug_to_path, league_paths, live_teams, live_leagues, live_members):
+    """
+    Builds the map (file names, with the backend layer on top) and the
+    per-league shards, writes both and returns {path: sha} of the outputs.
+    """
+    final_teams = {make_pretty_name(slug): path for slug, path in slug_to_path.items()}
+    final_leagues = {make_pretty_name(slug): path for slug, path in league_paths.items()}
+    final_teams.update(live_teams)
+    final_leagues.update(live_leagues)
+
+    # Per-league membership: curated team lists from league_map.json, then the backend's
+    shard_members = {}
+    if os.path.exists(LEAGUE_MAP_FILE):
+        with open(LEAGUE_MAP_FILE, 'r', encoding='utf-8') as f:
+            league_map = json.load(f)
+        for league, slugs in league_map.items():
+            for slug in slugs:
+                if slug in slug_to_path:
+                    add_member(shard_members, league, make_pretty_name(slug), slug_to_path[slug])
+    for key, live in live_members.items():
+        shard = shard_members.setdefault(key, { "name": live['name'], "sports": set(), "teams": {} })
+        shard['sports'] |= live['sports']
+        shard['teams'].update(live['teams'])
+
+    # Compact form: each path once (directory code + slug), names by normalized key (see image_map_codec.py).
+    # No sprites here: on the mixed-league home / watch pages one logo would pull a whole league sheet.
+    full_map = encode(final_teams, final_leagues)
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    with open(OUTPUT_FILE, 'w') as f:
+        json.dump(full_map, f, indent=2)
+
+    # Per-League Shards (league pages only fetch core + their own shard and sprite,
+    # with sprite coordinates from build_sprites.py when present)
+    sprite_index = {}
+    if os.path.exists(SPRITE_INDEX_FILE):
+        with open(SPRITE_INDEX_FILE, 'r', encoding='utf-8') as f:
+            sprite_index = json.load(f)
+    shards = build_shards(shard_members, final_leagues, sprite_index)
+    with open(SHARDS_FILE, 'w') as f:
+        json.dump(shards, f, indent=2)
+
+    print(f"--- Map Saved: {len(final_teams)} Teams, {len(final_leagues)} Leagues ({sum(map(len, full_map['files']))} files) ---")
+    print(f"--- Shards Saved: {len(shards['shards'])} Leagues, {len(decode(shards['core'])['teams'])} Shared Teams ---")
+    return {path: file_sha(path) for path in (OUTPUT_FILE, SHARDS_FILE)}
+
 # ==========================================
 # 3. MAIN EXECUTION
 # ==========================================
-def main():
+def main(aliases=None, team_logos=None, snapshot=None, logo_index=None):
+    """Standalone, or as a pipeline.py stage with the shared logo index and backend snapshot."""
     print("--- Generating Full Image Map ---")
 
-    # 1. Index Local Files (The "Source of Truth")
-    slug_to_path = {}
-    
-    # Load TSDB (Priority 1)
-    if os.path.exists(DIRS['tsdb']):
-        for f in os.listdir(DIRS['tsdb']):
-            if f.endswith('.webp'):
-                slug = f.replace('.webp', '')
-                slug_to_path[slug] = f"/{DIRS['tsdb']}/{f}"
-
-    # Load Streamed (Priority 2)
-    if os.path.exists(DIRS['streamed']):
-        for f in os.listdir(DIRS['streamed']):
-            if f.endswith('.webp'):
-                slug = f.replace('.webp', '')
-                if slug not in slug_to_path:
-                    slug_to_path[slug] = f"/{DIRS['streamed']}/{f}"
-
-    # Load Leagues
-    league_paths = {}
-    if os.path.exists(DIRS['leagues']):
-        for f in os.listdir(DIRS['leagues']):
-            if f.endswith('.webp'):
-                slug = f.replace('.webp', '')
-                league_paths[slug] = f"/{DIRS['leagues']}/{f}"
-
-    # 2. Build Initial Map from Files
-    final_teams = {}
-    final_leagues = {}
-
-    for slug, path in slug_to_path.items():
-        pretty_key = make_pretty_name(slug)
-        final_teams[pretty_key] = path
-
-    for slug, path in league_paths.items():
-        pretty_key = make_pretty_name(slug)
-        final_leagues[pretty_key] = path
-
-    print(f" > Indexed {len(final_teams)} images from local folders.")
-
-    # 3. Fetch Backend Matches (To map specific API names)
+    # 1. Index Local Files (The "Source of Truth"; persistent directory index, deduplicated
+    #    aliases resolve to the shared file)
+    if aliases is None: aliases = AssetManifest().aliases()
+    index = logo_index or load_logo_index(aliases)
+    slug_to_path = dict(team_logos) if team_logos is not None else index_team_logos(aliases, index)
+    league_paths = index.logos(DIRS['leagues'])
+    print(f" > Indexed {len(slug_to_path)} team and {len(league_paths)} league logos ({index.summary()}).")
+
+    # 2. Stream Backend Matches (To map specific API names; shared, versioned snapshot)
     print(" > Fetching backend matches to map live names...")
+    store = SnapshotStore()
+    matches = snapshot or store.stream(BACKEND_URL)
+
+    resolver = ResolutionCache(slug_to_path.keys(), FUZZY_CUTOFF, clean_display_name, slugify, rules=sorted(VALID_LEAGUES))
+
+    # Only new/changed matches are mapped again; the others reuse last run's result
+    # (all of them when the logo folders or this code changed, or the periodic full pass is due;
+    # the resolution cache then only re-checks names against the added/removed logos)
+    delta = store.delta(CONSUMER, fields=MAP_FIELDS)
+    state = store.state(CONSUMER)
+    code_digest = sha256(''.join(file_sha(path) for path in CODE_FILES).encode('utf-8'))
+    cached = {}
+    if not delta.full and state.get('logos_digest') == index.digest and state.get('code_digest') == code_digest:
+        cached = state.get('matches', {})
+    full = not cached
+
+    # Backend layer of the map: names and per-league members, in stream order
+    live_teams = {}
+    live_leagues = {}
+    live_members = {}
+    results = {}
+    reused = 0
     try:
-        data = requests.get(BACKEND_URL, timeout=10).json()
-        matches = data.get('matches', [])
-    except Exception as e:
-        print(f"   [!] Backend fetch failed: {e}")
-        matches = []
-
-    avail_slugs = list(slug_to_path.keys())
-
-    for m in matches:
-        # We NO LONGER check "if league not in whitelist: continue"
-        # We process ALL matches.
-        league_name = m.get('league')
-
-        # Map Teams
-        for t_key in ['home_team', 'away_team']:
-            raw_name = m.get(t_key)
-            if not raw_name: continue
-            
-            # A. Clean the name (Handles "A-League: Team A" -> "Team A")
-            clean_name = clean_display_name(raw_name)
-            
-            # B. Generate Slug from Clean Name
-            search_slug = "".join([c for c in clean_name.lower() if c.isalnum() or c == '-']).strip('-')
-            
-            # C. Try to match file
-            if search_slug in slug_to_path:
-                # Perfect Match
-                final_teams[clean_name] = slug_to_path[search_slug]
-                # Also Map "Raw Name" (just in case frontend sends raw name)
-                if raw_name != clean_name:
-                    final_teams[raw_name] = slug_to_path[search_slug]
+        for m in matches:
+            key = match_key(m)
+            changed = delta.add(m)
+            if key in results: continue
+            if key in cached and not changed:
+                results[key] = cached[key]
+                reused += 1
             else:
-                # Fuzzy Match
-                fuzzy = get_close_matches(search_slug, avail_slugs, n=1, cutoff=FUZZY_CUTOFF)
-                if fuzzy:
-                    matched_slug = fuzzy[0]
-                    final_teams[clean_name] = slug_to_path[matched_slug]
-
-        # Map League
-        if league_name:
-            l_slug = "".join([c for c in league_name.lower() if c.isalnum() or c == '-']).strip('-')
-            if l_slug in league_paths:
-                final_leagues[league_name] = league_paths[l_slug]
-
-    # 4. Save
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump({ "teams": final_teams, "leagues": final_leagues }, f, indent=2)
-        
-    print(f"--- Map Saved: {len(final_teams)} Teams, {len(final_leagues)} Leagues ---")
+                results[key] = map_match(m, slug_to_path, resolver, league_paths)
+            result = results[key]
+            live_teams.update(result['teams'])
+            live_leagues.update(result['leagues'])
+            for member in result['members']:
+                add_member(live_members, *member)
+        snapshot = snapshot or matches.snapshot
+        print(f"   Mapped {len(results) - reused} new/changed of {len(results)} matches "
+              f"({resolver.hits} names from the resolution cache, {resolver.misses} resolved)")
+    except (OSError, ValueError) as e:  # Network / parse errors of the backend stream
+        print(f"   [!] Backend fetch failed: {e}")
+        snapshot = None
+        # The stream broke after some matches arrived: a map written now would drop
+        # the names of every match after that point, so the last map is kept as it is
+        # (the state is not committed, the next run maps against the same snapshot)
+        if all(os.path.exists(path) for path in (OUTPUT_FILE, SHARDS_FILE)):
+            print("--- Keeping the previous map (incomplete backend layer) ---")
+            resolver.save()
+            index.save()
+            return
+
+    # 3. Incremental mode: the map only depends on the logo index, the backend layer,
+    #    league_map.json, sprite_index.json and this code. If none of them changed and
+    #    the outputs are still the ones written last time, there is nothing to rebuild.
+    inputs = [code_digest, index.digest, live_teams, live_leagues, live_members]
+    for path in (LEAGUE_MAP_FILE, SPRITE_INDEX_FILE):
+        inputs.append(file_sha(path) if os.path.exists(path) else None)
+    inputs_digest = sha256(json.dumps(inputs, default=sorted).encode('utf-8'))
+    outputs = {path: file_sha(path) for path in (OUTPUT_FILE, SHARDS_FILE) if os.path.exists(path)}
+    if not full and inputs_digest == state.get('inputs_digest') and outputs == state.get('outputs'):
+        print("--- Map up to date (no logo or backend name changes) ---")
+    else:
+        outputs = write_map(slug_to_path, league_paths, live_teams, live_leagues, live_members)
+
+    resolver.save()
+    if snapshot:
+        store.commit(CONSUMER, snapshot, full, logos_digest=index.digest, code_digest=code_digest,
+                     matches=results, inputs_digest=inputs_digest, outputs=outputs)
+    index.save()
 
 if __name__ == "__main__":
     main()
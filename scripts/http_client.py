@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# SHARED HTTP CLIENT (fetch_tsdb, fetch_streamed, generate_map, snapshot_schedule)
+# ==========================================
+# One pooled session for the whole run (keep-alive per host, no fresh TCP+TLS
+# handshake per logo), bounded retries with jittered exponential backoff on
+# 429/5xx and connection errors, consistent timeouts, and per-host counters
+# (requests, retries, bytes, latency) so the network cost can be measured.
+
+TIMEOUT = (5, 10)             # (connect, read) seconds
+RETRIES = 3                   # Extra attempts after the first one
+BACKOFF_BASE = 0.5            # Seconds; attempt n waits up to BACKOFF_BASE * 2**n
+BACKOFF_MAX = 20              # Upper bound for a single wait (also caps Retry-After)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 32                # Connections kept alive per host (>= fetch worker count)
+
+class TokenBucket:
+    """
+    Thread-safe rate limiter: `rate` requests per second on average, bursts of
+    up to `burst`. Pass as get(..., limiter=bucket); every attempt (retries
+    included) takes a token.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class HttpClient:
+    def __init__(self, timeout=TIMEOUT, retries=RETRIES, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, host, key, value=1):
+        with self._lock:
+            host_stats = self._stats.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            host_stats[key] += value
+            if key == 'seconds': host_stats['max_seconds'] = max(host_stats['max_seconds'], value)
+
+    def _backoff(self, attempt, resp=None):
+        wait = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            wait = max(wait, min(BACKOFF_MAX, int(retry_after)))
+        time.sleep(wait)
+
+    def request(self, method, url, **kwargs):
+        """
+        Like requests.request(), through the pooled session (optional
+        limiter=TokenBucket). Retries 429/5xx and connection errors; returns
+        the last response (whatever its status) or raises the last exception.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        limiter = kwargs.pop('limiter', None)
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            if limiter: limiter.acquire()
+            start = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(host, 'requests')
+                self._record(host, 'errors')
+                self._record(host, 'seconds', time.perf_counter() - start)
+                if attempt == self.retries: raise
+                self._record(host, 'retries')
+                self._backoff(attempt)
+                continue
+
+            self._record(host, 'requests')
+            # A streamed body is not read here (the caller consumes it): count its declared length
+            size = int(resp.headers.get('Content-Length') or 0) if kwargs.get('stream') else len(resp.content)
+            self._record(host, 'bytes', size)
+            self._record(host, 'seconds', time.perf_counter() - start)
+            if resp.status_code in RETRY_STATUSES and attempt < self.retries:
+                self._record(host, 'retries')
+                resp.close()  # Hands a streamed response's connection back to the pool
+                self._backoff(attempt, resp)
+                continue
+            return resp
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {host: dict(s) for host, s in self._stats.items()}
+
+    def print_stats(self):
+        stats = self.stats()
+        if not stats: return
+        print("--- HTTP Stats ---")
+        for host, s in sorted(stats.items()):
+            avg_ms = s['seconds'] / s['requests'] * 1000 if s['requests'] else 0
+            print(f"   {host}: {s['requests']} requests ({s['retries']} retries, {s['errors']} errors), "
+                  f"{s['bytes'] / 1024:.1f} KB, avg {avg_ms:.0f} ms, max {s['max_seconds'] * 1000:.0f} ms")
+
+# Process-wide client shared by every fetch script
+client = HttpClient()
+
+def get(url, **kwargs):
+    return client.get(url, **kwargs)
+
+def print_stats():
+    client.print_stats()
@@ -0,0 +1,113 @@
+import re
+
+# ==========================================
+# COMPACT IMAGE MAP FORMAT (generate_map -> build_site -> templates)
+# ==========================================
+# The logo map used to be {"teams": {name: path}, "leagues": {name: path}}
+# with the full path repeated for every name variant (pretty, clean and raw
+# name of the same team). The encoded form stores each logo path once, as a
+# directory code plus its slug, and looks names up by their normalized key
+# (the templates' normalizeKey: lowercase, [a-z0-9] only):
+#
+#   {"v": 2,
+#    "dirs":    ["/assets/logos/leagues/", "/assets/logos/streamed/", ...],
+#    "files":   [["premier-league", ...], ["arsenal", ...], ...],   # slugs per dir
+#    "teams":   {"own": [[start, end], ...], "keys": {key: file id}},
+#    "leagues": {"own": [...], "keys": {...}},
+#    "sprites": {"sheets": [[url, w, h], ...], "pos": {file id: [sheet, x, y]}}}
+#
+# File ids number the slugs of "files" in order (dir 0 first); every logo is
+# a .webp file, so the extension is implied. Most names are their file's slug
+# ("Arsenal" -> arsenal.webp), so the files in an "own" id range are found
+# under the key of their own slug and only the other keys (raw backend names,
+# fuzzy matches) are listed in "keys". Only plain [a-z0-9-] slugs are "own"
+# (their key is the slug without dashes); each directory lists those first,
+# sorted by key, and ranges never cross directories, so the client binary-
+# searches a range comparing slugs in place instead of building an index
+# (addImageMap / mapLogo / compareKey in the templates).
+
+FORMAT_VERSION = 2
+LOGO_EXT = '.webp'
+PLAIN_SLUG = re.compile(r'[a-z0-9-]+')
+
+def map_key(name):
+    """Lookup key of a team / league name (normalizeKey in the templates). Ex: "Sydney FC" -> "sydneyfc" """
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+def _lookup(entries, slugs, ids, dir_starts):
+    """{"own": id ranges, "keys": other keys} for a {key: path} map over the file table."""
+    own = []
+    covered = set()
+    for i, (slug, path) in enumerate(slugs):
+        key = map_key(slug)
+        if not PLAIN_SLUG.fullmatch(slug) or not key or entries.get(key) != path or key in covered: continue
+        covered.add(key)
+        if own and own[-1][1] == i and i not in dir_starts: own[-1][1] = i + 1
+        else: own.append([i, i + 1])
+    return {"own": own, "keys": {k: ids[p] for k, p in sorted(entries.items()) if k not in covered}}
+
+def encode(teams, leagues, sprites=None):
+    """
+    Encodes {name: path} team and league maps (and a generate_map.sprite_section)
+    into the compact form. Names with the same key keep the last path given.
+    """
+    teams = {map_key(n): p for n, p in teams.items()}
+    leagues = {map_key(n): p for n, p in leagues.items()}
+    teams.pop('', None)
+    leagues.pop('', None)
+    sprites = sprites or {}
+    pos = sprites.get('pos', {})
+
+    # File table: one entry per distinct path, grouped by directory
+    by_dir = {}
+    for path in set(teams.values()) | set(leagues.values()) | set(pos):
+        folder, name = path.rsplit('/', 1)
+        by_dir.setdefault(folder + '/', {})[name[:-len(LOGO_EXT)]] = path
+    dirs = sorted(by_dir)
+    files = [sorted(by_dir[d], key=lambda name: (not PLAIN_SLUG.fullmatch(name), map_key(name), name)) for d in dirs]
+    slugs = [(name, by_dir[d][name]) for d, names in zip(dirs, files) for name in names]
+    ids = {path: i for i, (name, path) in enumerate(slugs)}
+    dir_starts, start = set(), 0
+    for names in files:
+        dir_starts.add(start)
+        start += len(names)
+
+    encoded = {
+        "v": FORMAT_VERSION,
+        "dirs": dirs,
+        "files": files,
+        "teams": _lookup(teams, slugs, ids, dir_starts),
+        "leagues": _lookup(leagues, slugs, ids, dir_starts),
+    }
+    if sprites.get('sheets'):
+        sheet_keys = sorted(sprites['sheets'])
+        sheet_ids = {key: i for i, key in enumerate(sheet_keys)}
+        encoded['sprites'] = {
+            "sheets": [sprites['sheets'][key] for key in sheet_keys],
+            "pos": {str(ids[p]): [sheet_ids[key], x, y] for p, (key, x, y) in sorted(pos.items(), key=lambda e: ids[e[0]])
+                    if key in sheet_ids},
+        }
+    return encoded
+
+def decode(data):
+    """
+    Back to {"teams": {key: path}, "leagues": {key: path}} (plus "sprites" in
+    sprite_section form, sheets keyed by their URL) so build_site can merge parts.
+    """
+    if data.get('v') != FORMAT_VERSION:
+        return {"teams": {}, "leagues": {}}
+    slugs = [name for names in data['files'] for name in names]
+    paths = [f"{d}{name}{LOGO_EXT}" for d, names in zip(data['dirs'], data['files']) for name in names]
+    decoded = {}
+    for kind in ('teams', 'leagues'):
+        lookup = data.get(kind, {})
+        entries = {map_key(slugs[i]): paths[i] for start, end in lookup.get('own', []) for i in range(start, end)}
+        entries.update((k, paths[i]) for k, i in lookup.get('keys', {}).items())
+        decoded[kind] = entries
+    if data.get('sprites'):
+        sheets = data['sprites']['sheets']
+        decoded['sprites'] = {
+            "sheets": {sheet[0]: sheet for sheet in sheets},
+            "pos": {paths[int(i)]: [sheets[s][0], x, y] for i, (s, x, y) in data['sprites']['pos'].items()},
+        }
+    return decoded
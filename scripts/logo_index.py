@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import time
+
+# ==========================================
+# LOGO DIRECTORY INDEX
+# ==========================================
+# Persisted slug lists of the logo folders (.cache/logo_index.json, restored
+# between workflow runs):
+#   {"dirs": {folder: {"mtime_ns", "listed_at", "digest", "slugs": [...]}}}
+# A folder is only listed again (os.scandir) when its mtime changed since the
+# listing, or when it was modified so close to the listing that a later write
+# in the same timestamp tick could be missed. Adding, removing or renaming a
+# file changes the folder mtime; overwriting a logo in place does not, but it
+# keeps its URL, so the map does not change either.
+#
+# A fresh checkout gives every folder a new mtime, so CI runs still list them
+# once; the slug lists are compared with the cached ones and `digest` only
+# changes when a slug was added or removed, which is what generate_map keys
+# its incremental mode on.
+
+LOGO_INDEX_PATH = '.cache/logo_index.json'
+LOGO_EXT = '.webp'
+RACY_NS = 2 * 10**9       # Folders modified this close to their listing are listed again next time
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+class LogoIndex:
+    def __init__(self, dirs, path=LOGO_INDEX_PATH):
+        self.path = path
+        self.dirs = list(dirs)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f).get('dirs', {})
+        except (OSError, ValueError):
+            cached = {}
+        self.folders = {d: cached[d] for d in self.dirs if d in cached}
+        self.aliases = {d: {} for d in self.dirs}
+        self.listed = []          # Folders listed again by the last refresh()
+        self.changes = {}         # folder -> (added, removed) slug counts of the last refresh()
+        self.digest = None
+        self._unsaved = False
+
+    def _list(self, folder, mtime):
+        listed_at = time.time_ns()
+        slugs = []
+        if mtime is not None:
+            with os.scandir(folder) as entries:
+                slugs = sorted(e.name[:-len(LOGO_EXT)] for e in entries if e.name.endswith(LOGO_EXT))
+        old = self.folders.get(folder)
+        if old is None or old['slugs'] != slugs:
+            before = set(old['slugs']) if old else set()
+            after = set(slugs)
+            self.changes[folder] = (len(after - before), len(before - after))
+        self.folders[folder] = {"mtime_ns": mtime, "listed_at": listed_at, "digest": _digest(slugs), "slugs": slugs}
+        self.listed.append(folder)
+        self._unsaved = True
+
+    def refresh(self, aliases):
+        """
+        Brings the index up to date with the folders and the manifest's
+        {alias path: stored_at} aliases (missing folders count as empty).
+        """
+        self.listed, self.changes = [], {}
+        for folder in self.dirs:
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                mtime = None
+            entry = self.folders.get(folder)
+            fresh = entry is not None and entry['mtime_ns'] == mtime and (
+                mtime is None or mtime < entry['listed_at'] - RACY_NS)
+            if not fresh: self._list(folder, mtime)
+
+        self.aliases = {d: {} for d in self.dirs}
+        for alias, stored_at in aliases.items():
+            folder, f = os.path.split(alias)
+            if folder in self.aliases and f.endswith(LOGO_EXT):
+                self.aliases[folder][f[:-len(LOGO_EXT)]] = f"/{stored_at}"
+        self.digest = _digest([[self.folders[d]['digest'] for d in self.dirs], self.aliases])
+        return self
+
+    def logos(self, folder):
+        """
+        slug -> URL for a logo folder: the files in it plus the deduplicated
+        aliases recorded under it (those point at the shared file).
+        """
+        found = {slug: f"/{folder}/{slug}{LOGO_EXT}" for slug in self.folders[folder]['slugs']}
+        for slug, url in self.aliases[folder].items():
+            found.setdefault(slug, url)
+        return found
+
+    def summary(self):
+        """Ex: "1 of 3 folders listed again, +4 -1 logos" """
+        added = sum(a for a, r in self.changes.values())
+        removed = sum(r for a, r in self.changes.values())
+        return f"{len(self.listed)} of {len(self.dirs)} folders listed again, +{added} -{removed} logos"
+
+    def save(self):
+        """Writes the index if a folder was listed again."""
+        if not self._unsaved: return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"dirs": self.folders}, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+        self._unsaved = False
@@ -0,0 +1,179 @@
+import gzip
+import json
+import os
+import re
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# ==========================================
+# POST-RENDER OUTPUT STAGE (MINIFY + PRECOMPRESS)
+# ==========================================
+# Conservative by design: whitespace is only ever collapsed (never removed
+# where it could separate tokens), and strings, template literals, regex
+# literals, <pre> and <textarea> content are copied through untouched.
+
+RAW_BLOCK_RE = re.compile(r'<(script|style|pre|textarea)\b([^>]*)>(.*?)</\1\s*>', re.IGNORECASE | re.DOTALL)
+HTML_COMMENT_RE = re.compile(r'<!--(?!\[if|<!|>).*?-->', re.DOTALL)
+WHITESPACE_RE = re.compile(r'\s+')
+JS_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+
+def _collapse(ws):
+    # A newline is kept as a newline: it can end a JS statement (ASI)
+    return '\n' if '\n' in ws else ' '
+
+def _collapse_html(text):
+    text = HTML_COMMENT_RE.sub('', text)
+    return WHITESPACE_RE.sub(lambda m: _collapse(m.group(0)), text)
+
+# --- CSS ---
+CSS_TOKEN_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.DOTALL)
+CSS_TIGHT_RE = re.compile(r'\s*([{};,>])\s*')
+
+def minify_css(css):
+    out = []
+    pos = 0
+    for m in CSS_TOKEN_RE.finditer(css):
+        chunk = css[pos:m.start()]
+        pos = m.end()
+        out.append(chunk)
+        if m.group(1): out.append(m.group(1))
+        elif m.group(3): out.append(' ')
+    out.append(css[pos:])
+
+    # Tighten punctuation outside strings (strings are re-split to stay untouched)
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', ''.join(out))
+    for i in range(0, len(parts), 2):
+        p = CSS_TIGHT_RE.sub(r'\1', parts[i])
+        parts[i] = re.sub(r':\s+', ':', p).replace(';}', '}')
+    return ''.join(parts).strip()
+
+# --- JS ---
+JS_REGEX_PREV = set('(,=:[!&|?{};+-*%<>~^') | {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'yield', 'await'}
+
+def minify_js(js):
+    """Drops comments and collapses whitespace; every literal is copied verbatim."""
+    out = []
+    i, n = 0, len(js)
+    prev = ''       # last significant token (for regex-vs-division)
+    braces = []     # template literal nesting: depth of `${` per open template
+    while i < n:
+        c = js[i]
+        if c in ' \t\r\n\f\v':
+            j = i
+            while j < n and js[j] in ' \t\r\n\f\v': j += 1
+            ws = _collapse(js[i:j])
+            if out and out[-1] == ' ' and ws == '\n': out[-1] = '\n'
+            elif out and out[-1] not in (' ', '\n'): out.append(ws)
+            i = j
+            continue
+        if js.startswith('//', i):
+            j = js.find('\n', i)
+            i = n if j == -1 else j
+            continue
+        if js.startswith('/*', i):
+            j = js.find('*/', i + 2)
+            i = n if j == -1 else j + 2
+            if out and out[-1] not in (' ', '\n'): out.append(' ')
+            continue
+        if c in '"\'':
+            j = i + 1
+            while j < n and js[j] != c and js[j] != '\n':
+                j += 2 if js[j] == '\\' else 1
+            out.append(js[i:j + 1])
+            prev = 'str'
+            i = j + 1
+            continue
+        if c == '`' or (c == '}' and braces and braces[-1] == 0):
+            # Template literal text runs until the closing backtick or the next `${`
+            if c == '}': braces.pop()
+            j = i + 1
+            while j < n and js[j] != '`' and not js.startswith('${', j):
+                j += 2 if js[j] == '\\' else 1
+            if js.startswith('${', j):
+                braces.append(0)
+                j += 2
+            else:
+                j += 1
+            out.append(js[i:j])
+            prev = 'str'
+            i = j
+            continue
+        if c == '/' and (prev in JS_REGEX_PREV or prev == ''):
+            j = i + 1
+            in_class = False
+            while j < n and js[j] != '\n':
+                if js[j] == '\\': j += 2; continue
+                if js[j] == '[': in_class = True
+                elif js[j] == ']': in_class = False
+                elif js[j] == '/' and not in_class: break
+                j += 1
+            j += 1
+            while j < n and (js[j].isalnum() or js[j] == '_'): j += 1
+            out.append(js[i:j])
+            prev = 'regex'
+            i = j
+            continue
+        if c.isalnum() or c in '_$':
+            j = i
+            while j < n and (js[j].isalnum() or js[j] in '_$'): j += 1
+            prev = js[i:j]
+            out.append(prev)
+            i = j
+            continue
+        if c == '{' and braces: braces[-1] += 1
+        elif c == '}' and braces: braces[-1] -= 1
+        out.append(c)
+        prev = c
+        i += 1
+    return ''.join(out).strip()
+
+# --- HTML ---
+def _minify_block(m):
+    tag, attrs, body = m.group(1).lower(), m.group(2), m.group(3)
+    open_tag = _collapse_html(f'<{m.group(1)}{attrs}>')
+    close_tag = f'</{m.group(1)}>'
+    if tag == 'style':
+        body = minify_css(body)
+    elif tag == 'script':
+        t = re.search(r'type\s*=\s*["\']?([^"\'\s>]+)', attrs, re.IGNORECASE)
+        script_type = t.group(1).lower() if t else ''
+        if script_type in ('application/ld+json', 'application/json'):
+            try: body = json.dumps(json.loads(body), separators=(',', ':'), ensure_ascii=False)
+            except ValueError: pass
+        elif script_type in JS_TYPES and body.strip():
+            body = minify_js(body)
+    return open_tag + body + close_tag
+
+def minify_html(html):
+    """Minify a rendered page: markup whitespace/comments, inline CSS and inline JS."""
+    out = []
+    pos = 0
+    for m in RAW_BLOCK_RE.finditer(html):
+        out.append(_collapse_html(html[pos:m.start()]))
+        out.append(_minify_block(m) if m.group(1).lower() in ('script', 'style') else m.group(0))
+        pos = m.end()
+    out.append(_collapse_html(html[pos:]))
+    return ''.join(out).strip() + '\n'
+
+# --- PRECOMPRESSION ---
+def compressed_siblings(path):
+    """Paths of the precompressed copies written next to an output file."""
+    return [path + '.gz'] + ([path + '.br'] if brotli else [])
+
+def write_precompressed(path, data):
+    """Write .gz (and .br when brotli is installed) siblings at maximum compression."""
+    with open(path + '.gz', 'wb') as f:
+        # mtime=0 keeps the archive byte-identical across builds
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+    elif os.path.exists(path + '.br'):
+        os.remove(path + '.br') # Never leave a stale copy next to fresh output
+
+def remove_precompressed(path):
+    for sibling in (path + '.gz', path + '.br'):
+        if os.path.exists(sibling): os.remove(sibling)
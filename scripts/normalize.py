@@ -0,0 +1,107 @@
+import re
+from functools import lru_cache
+
+# ==========================================
+# NAME NORMALIZATION (fetch_tsdb, fetch_streamed, generate_map)
+# ==========================================
+# One slug rule and one name cleaner for harvesting and mapping, so a logo
+# saved as slugify(name) is found again by exactly the same slug instead of
+# falling through to fuzzy matching. League prefixes ("NBA - Celtics") are
+# matched with a prefix trie built once, longest prefix first, so the result
+# no longer depends on set iteration order (string hashing is randomized per
+# process, so that order changed between runs).
+
+# --- WHITELIST FOR NAME CLEANING ---
+# Used to strip league prefixes from team names, and by fetch_tsdb to pick
+# the leagues it harvests. It does NOT filter which teams get mapped.
+ALLOWED_LEAGUES_INPUT = """
+NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball,
+NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League,
+Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American-Football, American Football,
+Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership,
+Europa League, Europa-League, A League, A-League, A League Men, A League Women,
+Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
+"""
+VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
+
+_NON_SLUG = re.compile(r"[^\w\s-]")
+_SPACES = re.compile(r"\s+")
+_LEADING_SEPARATORS = re.compile(r"^[\s-]+")
+
+def _build_trie(words):
+    """Character trie; a node's '' key holds the length of the word ending there."""
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = len(word)
+    return root
+
+_LEAGUE_TRIE = _build_trie(VALID_LEAGUES)
+
+def league_prefixes(name):
+    """Lengths of the whitelisted leagues `name` starts with (case-insensitive), longest first."""
+    lengths = []
+    node = _LEAGUE_TRIE
+    for char in name.lower():
+        node = node.get(char)
+        if node is None: break
+        if '' in node: lengths.append(node[''])
+    return lengths[::-1]
+
+def slugify(name):
+    """File / lookup slug. Ex: "Sydney FC" -> "sydney-fc" """
+    if not name: return None
+    clean = _NON_SLUG.sub("", str(name).lower())
+    clean = _SPACES.sub("-", clean)
+    return clean.strip("-")
+
+def clean_display_name(name):
+    """
+    Sanitizer:
+    1. PRIORITY RULE: If a colon (:) is found, assume format "League: Team"
+       and strip everything before the first colon.
+    2. FALLBACK: Strip a whitelisted league prefix (e.g. "NBA - Team"), the
+       longest one that leaves a real name behind.
+    """
+    if not name: return None
+
+    # --- RULE 1: Generic Colon Stripper ---
+    # This ensures "A-League: Team A" becomes "Team A" automatically.
+    if ':' in name:
+        parts = name.split(':', 1)
+        if len(parts) > 1:
+            cleaned = parts[1].strip()
+            if cleaned and len(cleaned) > 1:
+                return cleaned
+
+    # --- RULE 2: Whitelist Fallback ---
+    for length in league_prefixes(name):
+        # Remove separator characters (spaces, hyphens) from the start
+        clean_remainder = _LEADING_SEPARATORS.sub("", name[length:])
+        if clean_remainder and len(clean_remainder.strip()) > 1:
+            return clean_remainder.strip()
+    return name.strip()
+
+@lru_cache(maxsize=1 << 16)
+def normalize(raw_name):
+    """(clean display name, slug) of a raw backend team name, memoized."""
+    clean_name = clean_display_name(raw_name)
+    return clean_name, slugify(clean_name)
+
+def normalize_matches(matches):
+    """
+    Batch form for a match list or stream: yields (match, names) with
+    names = {"home_team": (clean, slug), "away_team": (clean, slug), "league": slug}.
+    Each distinct name is normalized once.
+    """
+    league_slugs = {}
+    for m in matches:
+        league = m.get('league')
+        if league not in league_slugs: league_slugs[league] = slugify(league)
+        yield m, {
+            "home_team": normalize(m.get('home_team')),
+            "away_team": normalize(m.get('away_team')),
+            "league": league_slugs[league],
+        }
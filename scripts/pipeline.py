@@ -0,0 +1,153 @@
+import argparse
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import build_site
+import build_sprites
+import fetch_streamed
+import fetch_tsdb
+import generate_map
+import http_client
+from asset_manifest import AssetManifest
+from backend_snapshot import SnapshotStore
+from transcode import new_transcode_pool
+
+# ==========================================
+# 1. STAGES
+# ==========================================
+# Runs the asset stages as a dependency graph in one process, sharing the HTTP
+# pool, the asset manifest, the backend snapshot, the logo directory index and
+# one transcoder pool. Independent stages (TSDB harvest, backend fetch) overlap.
+#
+#   backend --+
+#             +--> streamed --> index --> sprites --> map --> site
+#   tsdb -----+
+#
+# The site stage republishes the pages and their fingerprinted map files, so
+# pages never point at logos the streamed stage's dedupe removed.
+def stage_backend(state):
+    try:
+        state['snapshot'] = SnapshotStore().fetch(fetch_streamed.BACKEND_URL, fetch_streamed.HEADERS)
+        print(f" > Backend snapshot {state['snapshot'].version} ({state['snapshot'].count} matches)")
+    except Exception as e:
+        # Not fatal: the streamed and map stages handle a missing backend themselves
+        print(f"   [!] Backend fetch failed: {e}")
+
+def stage_tsdb(state):
+    fetch_tsdb.main(manifest=state['manifest'], transcoder=state['transcoder'])
+
+def stage_streamed(state):
+    fetch_streamed.main(manifest=state['manifest'], snapshot=state.get('snapshot'), transcoder=state['transcoder'])
+
+def stage_index(state):
+    # One directory index refresh for both consumers (after the harvests and dedupe)
+    state['aliases'] = state['manifest'].aliases()
+    state['logo_index'] = generate_map.load_logo_index(state['aliases'])
+    state['team_logos'] = generate_map.index_team_logos(state['aliases'], state['logo_index'])
+
+def stage_sprites(state):
+    build_sprites.main(team_logos=state['team_logos'])
+
+def stage_map(state):
+    generate_map.main(aliases=state['aliases'], team_logos=state['team_logos'], snapshot=state.get('snapshot'),
+                      logo_index=state['logo_index'])
+
+def stage_site(state):
+    # Incremental (.build_manifest.json): only pages whose map URLs changed are rendered.
+    # Serial: a worker pool would be forked from this threaded process.
+    build_site.build_site()
+
+# name -> (dependencies, function)
+STAGES = {
+    'backend':  ([], stage_backend),
+    'tsdb':     ([], stage_tsdb),
+    'streamed': (['backend', 'tsdb'], stage_streamed),
+    'index':    (['streamed'], stage_index),
+    'sprites':  (['index'], stage_sprites),
+    'map':      (['index', 'sprites'], stage_map),
+    'site':     (['map'], stage_site),
+}
+
+# ==========================================
+# 2. SCHEDULER
+# ==========================================
+def run_stages(stages, state, skip=()):
+    """
+    Runs every stage as soon as its dependencies are done (skipped stages count
+    as done). A failed stage blocks its dependents. Returns {name: (status, seconds)}.
+    """
+    pending = {name: deps for name, (deps, fn) in stages.items()}
+    results = {}
+    for name in skip:
+        if pending.pop(name, None) is not None: results[name] = ('skipped', 0.0)
+
+    def timed(name):
+        start = time.perf_counter()
+        stages[name][1](state)
+        return time.perf_counter() - start
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, deps in list(pending.items()):
+                    statuses = [results.get(d, ('pending',))[0] for d in deps]
+                    if any(s in ('failed', 'blocked') for s in statuses):
+                        results[name] = ('blocked', 0.0)
+                    elif all(s in ('ok', 'skipped') for s in statuses):
+                        running[pool.submit(timed, name)] = (name, time.perf_counter())
+                    else:
+                        continue
+                    del pending[name]
+                    progressed = True
+            if not running: break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, started = running.pop(future)
+                try:
+                    results[name] = ('ok', future.result())
+                except Exception:
+                    traceback.print_exc()
+                    results[name] = ('failed', time.perf_counter() - started)
+                    print(f"   [!] Stage '{name}' failed")
+    return results
+
+def print_timings(results, wall):
+    print("--- Pipeline Stages ---")
+    for name in STAGES:
+        status, seconds = results.get(name, ('blocked', 0.0))
+        print(f"   {name:<10} {status:<8} {seconds:>8.2f} s")
+    busy = sum(seconds for status, seconds in results.values())
+    print(f"   {'total':<10} {'':<8} {wall:>8.2f} s wall ({busy:.2f} s of stage time)")
+
+# ==========================================
+# 3. MAIN EXECUTION
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Run the asset pipeline (TSDB, Streamed, sprites, map, site) in one process")
+    parser.add_argument('--skip', nargs='+', choices=sorted(STAGES), default=[], help="stages to skip (their outputs on disk are used as is)")
+    args = parser.parse_args()
+
+    print("--- Asset Pipeline ---")
+    start = time.perf_counter()
+    # One encoder pool for all stages (spawned, like the standalone scripts' pools)
+    transcoder = new_transcode_pool()
+    state = {'manifest': AssetManifest(), 'transcoder': transcoder}
+    try:
+        results = run_stages(STAGES, state, args.skip)
+    finally:
+        transcoder.shutdown()
+    state['manifest'].save()
+
+    http_client.print_stats()
+    print_timings(results, time.perf_counter() - start)
+    if any(status == 'failed' for status, seconds in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
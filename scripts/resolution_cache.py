@@ -0,0 +1,115 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from difflib import SequenceMatcher
+
+from fuzzy_index import FuzzyIndex
+
+# ==========================================
+# NAME RESOLUTION CACHE
+# ==========================================
+# Persisted raw backend name -> (clean name, search slug, matched logo slug)
+# (.cache/name_resolution.json, restored between workflow runs), so the names
+# that come back every run resolve with a dictionary hit instead of cleaning
+# and a fuzzy lookup. The fuzzy index is only built if some name misses.
+#
+# Invalidation is automatic:
+#   - Cleaning rules (the whole modules defining the clean / slug functions,
+#     with their regexes, helpers and prefix tables, plus fuzzy_index.py, the
+#     prefix list and the cutoff) changed -> everything is resolved again.
+#   - Logo files removed -> entries that resolved to them are dropped.
+#   - Logo files added -> an added slug equal to an entry's search slug makes
+#     it an exact hit; entries without an exact hit are compared against the
+#     added slugs only and take one if it beats their cached (score, slug).
+#     That is the answer a full lookup would give: the best over the old
+#     slugs is still the cached one.
+
+RESOLUTION_CACHE_PATH = '.cache/name_resolution.json'
+EXPIRE_DAYS = 30          # Names not seen for this long are dropped
+
+def rules_digest(clean, to_slug, cutoff, rules=()):
+    """Digest of everything a resolution depends on besides the logo files."""
+    h = hashlib.sha256()
+    for path in sorted({inspect.getsourcefile(clean), inspect.getsourcefile(to_slug), inspect.getsourcefile(FuzzyIndex)}):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+        h.update(b'\0')
+    h.update(f"{cutoff!r}\n{json.dumps(list(rules))}".encode('utf-8'))
+    return h.hexdigest()
+
+def score(word, slug):
+    """difflib's ratio for slug as a close match of word (same argument order as get_close_matches)."""
+    matcher = SequenceMatcher()
+    matcher.set_seq2(word)
+    matcher.set_seq1(slug)
+    return matcher.ratio()
+
+class ResolutionCache:
+    def __init__(self, slugs, cutoff, clean, to_slug, rules=(), path=RESOLUTION_CACHE_PATH):
+        self.path = path
+        self.cutoff = cutoff
+        self.clean = clean
+        self.to_slug = to_slug
+        self.slugs = set(slugs)
+        self.rules = rules_digest(clean, to_slug, cutoff, rules)
+        self.now = int(time.time())
+        self.hits = self.misses = 0
+        self._index = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        # raw name -> [clean name, search slug, matched slug or None, score, last used]
+        self.entries = cached.get('entries', {}) if cached.get('rules') == self.rules else {}
+        if self.entries:
+            self._refresh(set(cached.get('slugs', [])))
+
+    def _refresh(self, old_slugs):
+        """Brings the entries from the logo set they were resolved against to the current one."""
+        added, removed = self.slugs - old_slugs, old_slugs - self.slugs
+        added_index = FuzzyIndex(added, self.cutoff) if added else None
+        for raw, entry in list(self.entries.items()):
+            clean_name, slug, match, match_score, used_at = entry
+            if match in removed:
+                del self.entries[raw]
+            elif slug in added:
+                entry[2:4] = [slug, 1.0]
+            elif match != slug and added_index:
+                candidate = added_index.best(slug)
+                if candidate is None: continue
+                candidate_score = score(slug, candidate)
+                if match is None or (candidate_score, candidate) > (match_score, match):
+                    entry[2:4] = [candidate, candidate_score]
+
+    def resolve(self, raw_name):
+        """(clean name, search slug, matched logo slug or None). An exact hit has matched == search slug."""
+        entry = self.entries.get(raw_name)
+        if entry is None:
+            self.misses += 1
+            clean_name = self.clean(raw_name)
+            slug = self.to_slug(clean_name)
+            if not slug:
+                match, match_score = None, 0.0
+            elif slug in self.slugs:
+                match, match_score = slug, 1.0
+            else:
+                if self._index is None: self._index = FuzzyIndex(self.slugs, self.cutoff)
+                match = self._index.best(slug)
+                match_score = score(slug, match) if match is not None else 0.0
+            entry = self.entries[raw_name] = [clean_name, slug, match, match_score, self.now]
+        else:
+            self.hits += 1
+            entry[4] = self.now
+        return entry[0], entry[1], entry[2]
+
+    def save(self):
+        expire = self.now - EXPIRE_DAYS * 24 * 3600
+        entries = {raw: e for raw, e in sorted(self.entries.items()) if e[4] >= expire}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"rules": self.rules, "slugs": sorted(self.slugs), "entries": entries}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
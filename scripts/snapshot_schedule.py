@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import re
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import http_client
+from build_site import CONFIG_PATH, LEAGUE_MAP_PATH, SCHEDULE_DIR, league_page_filters, load_json, normalize_key
+
+# ==========================================
+# 1. CONFIGURATION
+# ==========================================
+# Fetches the sync-nodes payload once and writes compact static snapshots:
+#   assets/data/schedule/all.json          -> whole schedule (home page)
+#   assets/data/schedule/<league>.json     -> one per league page filter
+# Pages paint from the snapshot immediately, then reconcile with the live API.
+# Snapshots are committed, so they leave out the fields that change on nearly
+# every fetch and are only rewritten when what remains changed, so generated_at
+# is not a freshness marker: the pages ignore a snapshot once it is older than
+# SNAPSHOT_MAX_AGE and none of its matches started within that window.
+VOLATILE_FIELDS = ('live_viewers', 'status_text')  # Filled in by the live API
+SERVE_PORT = 8765
+
+# ==========================================
+# 2. HELPER FUNCTIONS
+# ==========================================
+def slugify(text):
+    """Same rule as slugify() in the page templates (TEAM_TO_LEAGUE keys)."""
+    s = re.sub(r'[^\w\s-]', '', str(text or '').lower(), flags=re.ASCII)
+    return re.sub(r'\s+', '-', s).strip('-')
+
+def is_listed(m):
+    """The pages skip matches where both sides are missing/TBA."""
+    home, away = m.get('home_team'), m.get('away_team')
+    return not ((home == 'TBA' or not home) and (away == 'TBA' or not away))
+
+def candidate_names(m, team_to_league):
+    """Every name the page-side resolveLeagueData() / filter could match on."""
+    names = [m.get('league'), m.get('sport')]
+    for key in ('home_team', 'away_team'):
+        names.append(team_to_league.get(slugify(m.get(key))))
+    home = m.get('home_team') or ''
+    if ':' in home: names.append(home.split(':')[0].strip())
+    return [n for n in names if n]
+
+def matches_filter(page_filter, names):
+    """
+    Superset of the league page's client-side filter (exact, or substring for
+    filters longer than 2 chars; also compared space/punctuation-insensitively
+    to cover the client's name fixes). The page re-applies its exact filter.
+    """
+    f_lower = page_filter.strip().lower()
+    f_key = normalize_key(page_filter)
+    for name in names:
+        n_lower = name.lower()
+        if n_lower == f_lower or normalize_key(name) == f_key: return True
+        if len(f_lower) > 2 and (f_lower in n_lower or (f_key and f_key in normalize_key(name))): return True
+    return False
+
+def stable_fields(m):
+    """A match without its VOLATILE_FIELDS."""
+    return {k: v for k, v in m.items() if k not in VOLATILE_FIELDS}
+
+def write_snapshot(path, matches, country, now_ms):
+    """Writes {generated_at, country, matches} unless only generated_at would change. Returns True if written."""
+    old = load_json(path)
+    if old.get('matches') == matches and old.get('country') == country:
+        return False
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"generated_at": now_ms, "country": country, "matches": matches}, f, separators=(',', ':'), ensure_ascii=False)
+    return True
+
+def serve_fixture(fixture, port):
+    """Local stand-in for the sync-nodes API: answers every GET with the fixture."""
+    with open(fixture, 'rb') as f:
+        body = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    print(f"--- Serving {fixture} on http://127.0.0.1:{port}/api/sync-nodes (Ctrl+C to stop) ---")
+    HTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+# ==========================================
+# 3. MAIN EXECUTION
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Write static match schedule snapshots from the sync-nodes API")
+    parser.add_argument('--source', help="API URL (default: site_settings.api_url from the config)")
+    parser.add_argument('--fixture', help="read a recorded payload instead of calling the API (offline)")
+    parser.add_argument('--record', help="save the fetched payload to this file (for --fixture / --serve)")
+    parser.add_argument('--serve', metavar='FIXTURE', help="run a local stand-in API that serves FIXTURE, then exit")
+    parser.add_argument('--port', type=int, default=SERVE_PORT)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve_fixture(args.serve, args.port)
+
+    print("--- Building Schedule Snapshot ---")
+    config = load_json(CONFIG_PATH)
+    country = config.get('site_settings', {}).get('target_country', 'US')
+
+    # 1. Load Payload (API, local stand-in or recorded fixture)
+    if args.fixture:
+        payload = load_json(args.fixture)
+        print(f" > Loaded fixture {args.fixture}")
+    else:
+        api_url = args.source or config.get('site_settings', {}).get('api_url', '')
+        if not api_url:
+            print("❌ No API URL (set site_settings.api_url or pass --source)")
+            return
+        try:
+            res = http_client.get(api_url, params={'country': country.lower()})
+            res.raise_for_status()
+            payload = res.json()
+        except Exception as e:
+            # Keep the previous snapshot; pages fall back to the live API when it gets too old
+            print(f"   [!] Fetch failed, snapshot left unchanged: {e}")
+            return
+        if args.record:
+            with open(args.record, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            print(f" > Recorded payload to {args.record}")
+
+    matches = [stable_fields(m) for m in payload.get('matches', []) if is_listed(m)]
+    print(f" > {len(matches)} matches")
+
+    # 2. Resolve League Names (same sources as the pages)
+    team_to_league = {}
+    for league_name, teams in load_json(LEAGUE_MAP_PATH).items():
+        for team in teams:
+            team_to_league[team] = league_name
+    names = [candidate_names(m, team_to_league) for m in matches]
+
+    # 3. Write Snapshots
+    os.makedirs(SCHEDULE_DIR, exist_ok=True)
+    now_ms = int(time.time() * 1000)
+    written = int(write_snapshot(os.path.join(SCHEDULE_DIR, 'all.json'), matches, country, now_ms))
+    keep = {'all.json'}
+    for page_filter in league_page_filters(config):
+        filename = f"{normalize_key(page_filter)}.json"
+        keep.add(filename)
+        subset = [m for m, n in zip(matches, names) if matches_filter(page_filter, n)]
+        written += write_snapshot(os.path.join(SCHEDULE_DIR, filename), subset, country, now_ms)
+
+    # Snapshots of league pages that no longer exist
+    for f in os.listdir(SCHEDULE_DIR):
+        if f.endswith('.json') and f not in keep:
+            os.remove(os.path.join(SCHEDULE_DIR, f))
+
+    print(f"--- Snapshot Saved: {len(keep)} files ({written} updated) ---")
+
+if __name__ == "__main__":
+    main()